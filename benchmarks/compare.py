@@ -0,0 +1,57 @@
+"""Compares two results files of `benchmarks.run`.
+
+## Usage::
+
+    $ python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(before: dict, after: dict) -> str:
+    lines = [
+        "%s -> %s" % (before["commit"], after["commit"]),
+        "%-9s %-18s %14s %14s %8s"
+        % ("size", "benchmark", "before/s", "after/s", "change"),
+    ]
+    for size, benchmarks in after["results"].items():
+        for name, result in benchmarks.items():
+            previous = before["results"].get(size, {}).get(name)
+            if previous is None:
+                lines.append(
+                    "%-9s %-18s %14s %14.0f" % (size, name, "-", result["per_sec"])
+                )
+                continue
+            change = result["per_sec"] / previous["per_sec"] - 1
+            line = "%-9s %-18s %14.0f %14.0f %+7.1f%%" % (
+                size,
+                name,
+                previous["per_sec"],
+                result["per_sec"],
+                100 * change,
+            )
+            if result["operations"] != previous["operations"]:
+                # for the search, fewer nodes for the same depth is a speedup too
+                line += "  (%d -> %d operations)" % (
+                    previous["operations"],
+                    result["operations"],
+                )
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before", help="results of the reference commit")
+    parser.add_argument("after", help="results to compare")
+    args = parser.parse_args(args)
+    print(compare(load(args.before), load(args.after)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Recorded positions the benchmarks run on.
+
+The positions are stored as the moves leading to them, the first player playing
+the token value 1. They were generated by random games with a fixed seed, and
+are recorded so that a change to the random generators or to `Board` does not
+change what is measured.
+
+## Usage::
+
+    $ python -m benchmarks.positions  # regenerates positions.json
+"""
+import json
+import logging
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from models.board import Board
+from src.logger import logger
+
+POSITIONS_PATH = Path(__file__).parent / "positions.json"
+SEED = 2022
+POSITIONS_PER_SIZE = 20
+
+# name of each benchmarked size: (nrows, ncols, winning_length)
+SIZES = {
+    "6x7/4": (6, 7, 4),
+    "9x10/5": (9, 10, 5),
+    "20x20/5": (20, 20, 5),
+}
+
+
+def replay(size: str, moves: List[int]) -> Tuple[Board, int]:
+    """Returns the board of `size` after `moves`, and the token value to play."""
+    board = Board(*SIZES[size])
+    token_value = 1
+    for col in moves:
+        board.play(token_value, col)
+        token_value = -token_value
+    return board, token_value
+
+
+def load_positions(path=POSITIONS_PATH) -> Dict[str, List[List[int]]]:
+    with Path(path).open() as file:
+        return json.load(file)
+
+
+def generate_positions(seed=SEED) -> Dict[str, List[List[int]]]:
+    """Plays random games and keeps one non final position of each, at a random
+    number of moves."""
+    rng = random.Random(seed)
+    positions = {}
+    for size, (nrows, ncols, winning_length) in SIZES.items():
+        positions[size] = []
+        while len(positions[size]) < POSITIONS_PER_SIZE:
+            board = Board(nrows, ncols, winning_length)
+            token_value, moves = 1, []
+            length = rng.randrange(min(board.capacity, 30))
+            while len(moves) < length and not board.is_leaf():
+                col = rng.choice(board.get_available_columns())
+                board.play(token_value, col)
+                token_value = -token_value
+                moves.append(col)
+            if not board.is_leaf():
+                positions[size].append(moves)
+    return positions
+
+
+def save_positions(positions: Dict[str, List[List[int]]], path=POSITIONS_PATH):
+    # one position per line, so that diffs stay readable
+    sizes = []
+    for size, moves in positions.items():
+        lines = ",\n".join("    %s" % json.dumps(position) for position in moves)
+        sizes.append('  "%s": [\n%s\n  ]' % (size, lines))
+    with Path(path).open("w") as file:
+        file.write("{\n%s\n}\n" % ",\n".join(sizes))
+
+
+if __name__ == "__main__":
+    logger.setLevel(logging.INFO)
+    save_positions(generate_positions())
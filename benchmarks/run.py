@@ -0,0 +1,176 @@
+"""Benchmarks of the hot paths of the engine.
+
+Each benchmark runs on the recorded positions of `benchmarks/positions.json`,
+for every size of `benchmarks.positions.SIZES`, and keeps the best time of
+`--repeats` runs. Results are written as JSON so that two commits can be
+compared.
+
+## Usage::
+
+    $ python -m benchmarks.run -o before.json
+    $ git checkout my-branch
+    $ python -m benchmarks.run -o after.json
+    $ python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from ai.alphabeta_player import AlphaBetaPlayer
+from ai.search import Deadline
+from models.board import Board
+from src.logger import logger
+from utils import longest_sequence
+
+from benchmarks.positions import SIZES, load_positions, replay
+
+REPEATS = 5
+SEED = 2022
+PLAYOUTS = 200
+# search depth of each size, for searches of a few seconds per size
+SEARCH_DEPTHS = {"6x7/4": 9, "9x10/5": 6, "20x20/5": 3}
+
+Positions = List[Tuple[Board, int]]
+
+
+def measure(run: Callable[[], int], repeats: int) -> Dict[str, float]:
+    """Returns the best time of `repeats` calls to `run`, which returns the
+    number of operations it did."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operations = run()
+        best = min(best, time.perf_counter() - start)
+    return {
+        "operations": operations,
+        "seconds": best,
+        "per_sec": operations / best if best else 0.0,
+    }
+
+
+def bench_play_cancel(boards: Positions) -> int:
+    operations = 0
+    for board, token_value in boards:
+        for col in board.get_available_columns():
+            board.play(token_value, col)
+            board.cancel_play(token_value, col)
+            operations += 1
+    return operations
+
+
+def bench_check_for_winner(boards: Positions) -> int:
+    operations = 0
+    for board, _ in boards:
+        for col in range(board.ncols):
+            row = board.get_height(col) - 1
+            if row >= 0:
+                board.check_for_winner((col, row))
+                operations += 1
+    return operations
+
+
+def bench_longest_sequence(boards: Positions) -> int:
+    operations = 0
+    for board, _ in boards:
+        for col in range(board.ncols):
+            longest_sequence(board.get_col(col)[0])
+        for row in range(board.nrows):
+            longest_sequence(board.get_row(row)[0])
+        operations += board.ncols + board.nrows
+    return operations
+
+
+def bench_random_playouts(size: str, games: int, seed: int) -> int:
+    """Plays `games` random games, returns the number of moves played."""
+    rng = random.Random(seed)
+    board = Board(*SIZES[size])
+    moves = 0
+    for _ in range(games):
+        board.reset()
+        token_value = 1
+        while not board.is_leaf():
+            board.play(token_value, rng.choice(board.get_available_columns()))
+            token_value = -token_value
+            moves += 1
+    return moves
+
+
+def bench_search(boards: Positions, depth: int) -> int:
+    """Searches each position `depth` plies deep, returns the number of nodes."""
+    nodes = 0
+    for board, token_value in boards:
+        player = AlphaBetaPlayer(opening_book=None)
+        player.deadline = Deadline(None)
+        player.search(board, token_value, depth)
+        nodes += player.nodes
+    return nodes
+
+
+def run_benchmarks(sizes: List[str], repeats=REPEATS) -> dict:
+    positions = load_positions()
+    results = {}
+    for size in sizes:
+        boards = [replay(size, moves) for moves in positions[size]]
+        logger.info("Benchmarking %s on %d positions", size, len(boards))
+        results[size] = {
+            "play_cancel": measure(lambda: bench_play_cancel(boards), repeats),
+            "check_for_winner": measure(
+                lambda: bench_check_for_winner(boards), repeats
+            ),
+            "longest_sequence": measure(
+                lambda: bench_longest_sequence(boards), repeats
+            ),
+            "random_playouts": measure(
+                lambda: bench_random_playouts(size, PLAYOUTS, SEED), repeats
+            ),
+            # a single run: the node count is the same every time
+            "search": measure(
+                lambda: bench_search(boards, SEARCH_DEPTHS[size]), repeats=1
+            ),
+        }
+    return results
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="JSON file of the results")
+    parser.add_argument("-r", "--repeats", type=int, default=REPEATS)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    args = parser.parse_args(args)
+
+    logger.setLevel(logging.INFO)
+    report = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": run_benchmarks(args.sizes, args.repeats),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+        logger.info("Results written to %s", args.output)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ from PyQt5.QtWidgets import QApplication
 # from ai.alphabeta_player import AlphaBetaPlayer
 from src.game import GameSettings
 from src.index import Connect4
-from src.logger import logger
+from src.logger import add_jsonl_sink, logger
 from src.models.player import HumanPlayer  # , RandomPlayer
 
 # Add QT plugin path to environment for windows platform
@@ -27,9 +27,12 @@ if __name__ == "__main__":
 
     args = sys.argv[1:]
     logger.setLevel(logging.INFO)
-    if len(args) == 1 and args[0] == "--debug":
+    if "--debug" in args:
         logger.setLevel(logging.DEBUG)
         settings.timeout_secs = None
+    # --events PATH: writes the game events to the JSONL file PATH
+    if "--events" in args[:-1]:
+        add_jsonl_sink(args[args.index("--events") + 1])
 
     logger.info("Starting the Connect4 app...")
     connect4 = Connect4(player1, player2, settings)
@@ -1,2 +1,3 @@
 from .alphabeta_player import AlphaBetaPlayer
 from .rl_player import RLPlayer
+from .solver import SolverPlayer
@@ -0,0 +1,307 @@
+import multiprocessing
+
+from models.board import Board
+from models.player import Player
+
+from ai.evaluation import get_evaluator
+from ai.move_ordering import MoveOrdering
+from ai.opening_book import DEFAULT_BOOK_PATH, OpeningBook
+from ai.parallel_search import ParallelSearch
+from ai.search import Deadline, SearchResult, SearchTimeout, iterative_deepening
+from ai.transposition import (
+    DEPTH_PREFERRED,
+    EXACT,
+    LOWER_BOUND,
+    UPPER_BOUND,
+    TranspositionTable,
+)
+
+infty = float("inf")
+
+WIN_SCORE = 1_000_000
+# Scores above this one are wins, whose distance to the root is encoded in them.
+MIN_WIN_SCORE = WIN_SCORE - 10_000
+
+
+def to_table_score(score: int, ply: int) -> int:
+    """Makes win scores relative to the stored node instead of the root."""
+    if score > MIN_WIN_SCORE:
+        return score + ply
+    if score < -MIN_WIN_SCORE:
+        return score - ply
+    return score
+
+
+def from_table_score(score: int, ply: int) -> int:
+    if score > MIN_WIN_SCORE:
+        return score - ply
+    if score < -MIN_WIN_SCORE:
+        return score + ply
+    return score
+
+
+class AlphaBetaPlayer(Player):
+    """Negamax search with alpha-beta pruning and a transposition table.
+
+    The search is deepened one ply at a time until the time budget given by
+    `GameSettings.timeout_secs` runs out, and the move of the last completed
+    depth is played. With `GameSettings.search_workers` above 1, the moves of the
+    root are searched in parallel by a pool of processes, see
+    `ai.parallel_search`.
+
+    Args
+    ----
+        depth: `int`\n
+            Maximum number of plies searched before evaluating a position.
+        tt_bytes: `int`\n
+            Memory budget of the transposition table.
+        tt_policy: `str`\n
+            Replacement policy of the transposition table, see
+            `ai.transposition.TranspositionTable`.
+        opening_book: `str` or `Path`\n
+            Opening book played before searching when it matches the grid, see
+            `ai.opening_book`. Ignored if the file does not exist.
+    """
+
+    def __init__(
+        self,
+        name="AlphaBeta",
+        depth=12,
+        tt_bytes=64 * 2**20,
+        tt_policy=DEPTH_PREFERRED,
+        opening_book=DEFAULT_BOOK_PATH,
+    ):
+        super().__init__(name)
+        self.depth = depth
+        self.tt_bytes = tt_bytes
+        self.tt_policy = tt_policy
+        self.table = TranspositionTable(max_bytes=tt_bytes, policy=tt_policy)
+        self.evaluator = None
+        self.move_ordering = MoveOrdering()
+        self.nodes = 0
+        self.root_move = None
+        self.deadline = Deadline(None)
+        self.last_search = SearchResult()
+        self.opening_book_path = opening_book
+        self.opening_book = None
+        self.parallel_search = None
+
+    def __getstate__(self):
+        # worker processes can't be pickled, each copy starts its own pool
+        state = self.__dict__.copy()
+        state["parallel_search"] = None
+        return state
+
+    def strategy(self, board: Board):
+        move = self.get_book_move(board)
+        if move is not None:
+            self.last_search = SearchResult(move=move)
+            return move
+
+        self.table.new_search()
+        self.move_ordering.new_search()
+        self.nodes = 0
+        self.deadline = Deadline.from_settings(self.settings, self.cancel_token)
+        token_value = self.token.value
+        max_depth = min(self.depth, board.capacity)
+        is_final = lambda score: abs(score) > MIN_WIN_SCORE
+        workers = getattr(self.settings, "search_workers", 1)
+        # daemon processes, like the runner's pool workers, can't start a pool
+        if workers > 1 and not multiprocessing.current_process().daemon:
+            self.last_search = self.get_parallel_search(workers).search(
+                board, token_value, max_depth, self.deadline, is_final
+            )
+        else:
+            self.last_search = iterative_deepening(
+                lambda depth: self.search(board, token_value, depth),
+                max_depth=max_depth,
+                deadline=self.deadline,
+                is_final=is_final,
+                count_nodes=lambda: self.nodes,
+            )
+            self.last_search.probes = self.table.probes
+            self.last_search.hits = self.table.hits
+        if self.last_search.move is None:
+            return board.get_available_columns()[0]
+        return self.last_search.move
+
+    def get_book_move(self, board: Board):
+        # the book is mapped by the process playing, not pickled with the player
+        if self.opening_book is None and self.opening_book_path is not None:
+            self.opening_book = OpeningBook.load(self.opening_book_path)
+            if self.opening_book is None:
+                self.opening_book_path = None
+        if self.opening_book is None:
+            return None
+        return self.opening_book.best_move(board, self.token.value)
+
+    def get_parallel_search(self, workers: int) -> ParallelSearch:
+        if self.parallel_search is None or self.parallel_search.workers != workers:
+            if self.parallel_search is not None:
+                self.parallel_search.close()
+            self.parallel_search = ParallelSearch(
+                workers, self.depth, self.tt_bytes, self.tt_policy
+            )
+        return self.parallel_search
+
+    def search_move(
+        self,
+        board: Board,
+        token_value: int,
+        col: int,
+        depth: int,
+        deadline: Deadline,
+        alpha: float = -infty,
+        beta: float = infty,
+    ):
+        """Returns the score of `token_value` playing `col`, searched `depth` plies
+        deep, along with the number of nodes searched and the number of probes and
+        hits of the transposition table. Returns `None` if the deadline expires
+        first.
+
+        The score is only exact within the window `(alpha, beta)`: below it, it is
+        an upper bound of the score, above it a lower bound."""
+        if deadline.expired():
+            return None
+        if depth == 1:
+            self.move_ordering.new_search()
+        self.deadline = deadline
+        self.nodes = 0
+        probes, hits = self.table.probes, self.table.hits
+        board.play(token_value, col)
+        try:
+            if board.winner_token_value == token_value:
+                score = WIN_SCORE
+            elif board.is_full():
+                score = 0
+            else:
+                # the child's win and loss scores are one ply further from the root
+                score, _ = self.search(
+                    board,
+                    -token_value,
+                    depth - 1,
+                    to_table_score(-beta, 1),
+                    to_table_score(-alpha, 1),
+                )
+                score = -from_table_score(score, 1)
+        except SearchTimeout:
+            return None
+        finally:
+            board.cancel_play(token_value, col)
+        return (
+            score,
+            self.nodes,
+            self.table.probes - probes,
+            self.table.hits - hits,
+        )
+
+    def search(
+        self,
+        board: Board,
+        token_value: int,
+        depth: int,
+        alpha: float = -infty,
+        beta: float = infty,
+    ):
+        """Returns the best score and column for `token_value` to play."""
+        self.setup_evaluation(board)
+        self.move_ordering.setup(board)
+        score = self.negamax(board, token_value, depth, alpha, beta, 0)
+        return score, self.root_move
+
+    def negamax(
+        self,
+        board: Board,
+        token_value: int,
+        depth: int,
+        alpha: float,
+        beta: float,
+        ply: int,
+    ):
+        self.nodes += 1
+        if not self.nodes & 0xFF:
+            self.deadline.check()
+        # mirror images share their entry, its move is stored for the canonical one
+        key, mirrored = board.get_canonical_key(token_value)
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            _, entry_depth, bound, score, tt_move, _ = entry
+            if mirrored and tt_move is not None:
+                tt_move = board.mirror_column(tt_move)
+            if entry_depth >= depth and ply > 0:
+                score = from_table_score(score, ply)
+                if bound == EXACT:
+                    return score
+                if bound == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        if depth == 0:
+            return self.evaluate(board, token_value)
+
+        alpha_orig = alpha
+        best_score, best_move = -infty, None
+        if depth == 1:
+            best_score, best_move = self.search_frontier(board, token_value, ply)
+        else:
+            for col in self.move_ordering.order(board, token_value, ply, tt_move):
+                board.play(token_value, col)
+                try:
+                    if board.winner_token_value == token_value:
+                        score = WIN_SCORE - ply
+                    elif board.is_full():
+                        score = 0
+                    else:
+                        score = -self.negamax(
+                            board, -token_value, depth - 1, -beta, -alpha, ply + 1
+                        )
+                finally:
+                    # also undo the move when the search times out
+                    board.cancel_play(token_value, col)
+
+                if score > best_score:
+                    best_score, best_move = score, col
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.move_ordering.add_cutoff(
+                            board, token_value, col, ply, depth
+                        )
+                        break
+
+        if ply == 0:
+            self.root_move = best_move
+        if best_score <= alpha_orig:
+            bound = UPPER_BOUND
+        elif best_score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        if mirrored:
+            best_move = board.mirror_column(best_move)
+        self.table.store(key, depth, bound, to_table_score(best_score, ply), best_move)
+        return best_score
+
+    def search_frontier(self, board: Board, token_value: int, ply: int):
+        """Returns the best score and column one ply before the leaves, scoring
+        all the moves in a single evaluation."""
+        wins = board.get_winning_moves(token_value)
+        if wins:
+            return WIN_SCORE - ply, wins[0]
+        columns = board.get_available_columns()
+        if board.capacity == 1:
+            return 0, columns[0]
+
+        scores = self.evaluator.evaluate_moves(board, token_value, columns)
+        best = int(scores.argmax())
+        return int(scores[best]), columns[best]
+
+    def setup_evaluation(self, board: Board):
+        self.evaluator = get_evaluator(board.nrows, board.ncols, board.winning_length)
+
+    def evaluate(self, board: Board, token_value: int) -> int:
+        return self.evaluator.evaluate_board(board, token_value)
@@ -0,0 +1,149 @@
+"""Heuristic evaluation of Connect4 positions with NumPy.
+
+Every window of `winning_length` aligned cells is a possible alignment. A window
+holding tokens of a single player is worth `window_weights[n]` to this player,
+`n` being its number of tokens. Windows holding tokens of both players can't be
+completed and are worth nothing.
+
+The windows are precomputed once per grid as a matrix of cell indexes, so a
+position, or a stack of positions, is scored with one gather and one reduction.
+"""
+import functools
+from typing import Sequence
+
+import numpy as np
+
+from models.board import Board
+
+# window codes are at most `winning_length * (winning_length + 1)`
+CODE_DTYPE = np.int16
+
+
+def get_windows(nrows: int, ncols: int, winning_length: int, stride: int):
+    """Returns the `(nwindows, winning_length)` matrix of the indexes of the cells
+    of each window, the cell `(col, row)` having the index `col * stride + row`."""
+    windows = []
+    for dcol, drow in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        for col in range(ncols):
+            for row in range(nrows):
+                last_col = col + dcol * (winning_length - 1)
+                last_row = row + drow * (winning_length - 1)
+                if not (0 <= last_col < ncols and 0 <= last_row < nrows):
+                    continue
+                windows.append(
+                    [
+                        (col + dcol * i) * stride + row + drow * i
+                        for i in range(winning_length)
+                    ]
+                )
+    return np.array(windows, dtype=np.intp).reshape(-1, winning_length)
+
+
+def get_default_weights(winning_length: int):
+    """A window is worth 4 times more with each extra token."""
+    return (0,) + tuple(4**n for n in range(winning_length))
+
+
+class WindowEvaluator:
+    """Scores positions of a `nrows x ncols` grid from the point of view of the
+    token value 1.
+
+    Args
+    ----
+        window_weights: `Sequence[int]`\n
+            Value of a window holding 0, 1, ..., `winning_length` tokens of a
+            single player.
+    """
+
+    def __init__(
+        self,
+        nrows=6,
+        ncols=7,
+        winning_length=4,
+        window_weights: Sequence[int] = None,
+    ):
+        self.nrows = nrows
+        self.ncols = ncols
+        self.winning_length = winning_length
+        if window_weights is None:
+            window_weights = get_default_weights(winning_length)
+        if len(window_weights) != winning_length + 1:
+            raise ValueError("expected %d window weights." % (winning_length + 1))
+
+        # Cells are encoded so that summing a window gives a unique code:
+        # `mine + base * theirs`. Index -1 is the encoding of the token value -1.
+        base = winning_length + 1
+        self.encoding = np.array([0, 1, base], dtype=CODE_DTYPE)
+        self.scores = np.zeros(base * base, dtype=np.int64)
+        for mine in range(base):
+            self.scores[mine] = window_weights[mine]
+            self.scores[base * mine] = -window_weights[mine]
+        self.base = base
+
+        # windows over `(..., ncols, nrows)` arrays of cells, and over bitboards
+        self.windows = get_windows(nrows, ncols, winning_length, nrows)
+        self.bit_windows = get_windows(nrows, ncols, winning_length, nrows + 1)
+        self.nbytes = -(-ncols * (nrows + 1) // 8)
+
+    @classmethod
+    def from_settings(cls, settings, window_weights: Sequence[int] = None):
+        return get_evaluator(
+            settings.grid_nrows,
+            settings.grid_ncols,
+            settings.winning_length,
+            None if window_weights is None else tuple(window_weights),
+        )
+
+    def evaluate(self, cells: np.ndarray) -> np.ndarray:
+        """Returns the scores of a stack of positions.
+
+        Args
+        ----
+            cells: `np.ndarray` of shape `(..., ncols, nrows)`\n
+                Token value of each cell, 0 for the empty ones.
+
+        Returns
+        -------
+            scores: `np.ndarray` of shape `(...)`
+        """
+        cells = np.asarray(cells)
+        encoded = self.encoding[cells.reshape(cells.shape[:-2] + (-1,))]
+        codes = encoded[..., self.windows].sum(axis=-1, dtype=CODE_DTYPE)
+        return self.scores[codes].sum(axis=-1)
+
+    def evaluate_board(self, board: Board, token_value: int = 1) -> int:
+        """Returns the score of `board` from the point of view of `token_value`."""
+        codes = self.encode(board)[self.bit_windows].sum(axis=-1, dtype=CODE_DTYPE)
+        score = int(self.scores[codes].sum())
+        return score if token_value == 1 else -score
+
+    def evaluate_moves(
+        self, board: Board, token_value: int, columns: Sequence[int]
+    ) -> np.ndarray:
+        """Returns the scores of the positions reached by `token_value` playing in
+        each of `columns`, from its point of view, in a single batch."""
+        encoded = self.encode(board)
+        stack = np.repeat(encoded[np.newaxis], len(columns), axis=0)
+        cells = [col * board.stride + board.heights[col] for col in columns]
+        stack[np.arange(len(columns)), cells] += self.encoding[token_value]
+        codes = stack[:, self.bit_windows].sum(axis=-1, dtype=CODE_DTYPE)
+        scores = self.scores[codes].sum(axis=-1)
+        return scores if token_value == 1 else -scores
+
+    def encode(self, board: Board) -> np.ndarray:
+        return self.unpack(board.masks[1]) + self.base * self.unpack(board.masks[-1])
+
+    def unpack(self, mask: int) -> np.ndarray:
+        """Returns the bits of a bitboard as an array of 0 and 1."""
+        data = np.frombuffer(mask.to_bytes(self.nbytes, "little"), dtype=np.uint8)
+        return np.unpackbits(data, bitorder="little").astype(CODE_DTYPE)
+
+
+def board_to_cells(board: Board) -> np.ndarray:
+    """Returns the `(ncols, nrows)` array of the token values of `board`."""
+    return np.array(board.board, dtype=np.int8)
+
+
+@functools.lru_cache(maxsize=None)
+def get_evaluator(nrows, ncols, winning_length, window_weights=None):
+    return WindowEvaluator(nrows, ncols, winning_length, window_weights)
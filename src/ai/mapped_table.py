@@ -0,0 +1,113 @@
+"""Read-only tables of sorted 64 bits keys, memory-mapped from a file.
+
+A table file is made of a header, the sorted keys and, for each key, a row of
+`width` values of the same `array` typecode, all little-endian::
+
+    | header | key_0 ... key_n-1 | values of key_0 | ... | values of key_n-1 |
+
+The file is never loaded in memory: lookups binary-search the mapped keys, so
+opening a table is instant and processes mapping the same file share its pages.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
+VERSION = 1
+# magic, version, values typecode, values width, number of keys, metadata
+HEADER = struct.Struct("<4sBcHQ8q")
+
+
+def write_table(
+    path: Union[str, Path],
+    magic: bytes,
+    items: Iterable[Tuple[int, Sequence]],
+    typecode: str,
+    width: int = 1,
+    metadata: Sequence[int] = (),
+):
+    """Writes the `(key, values)` items to `path`, `values` being `width` numbers
+    of the `array` typecode `typecode`. Up to 8 ints of `metadata` are kept in
+    the header."""
+    rows = sorted(items)
+    keys = array("Q", (key for key, _ in rows))
+    values = array(typecode)
+    for _, row in rows:
+        if len(row) != width:
+            raise ValueError("expected %d values, got %r." % (width, row))
+        values.extend(row)
+    if sys.byteorder != "little":
+        keys.byteswap()
+        values.byteswap()
+
+    metadata = tuple(metadata) + (0,) * (8 - len(metadata))
+    header = HEADER.pack(magic, VERSION, typecode.encode(), width, len(keys), *metadata)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as file:
+        file.write(header)
+        keys.tofile(file)
+        values.tofile(file)
+
+
+class MappedTable:
+    def __init__(self, path: Union[str, Path], magic: bytes):
+        if sys.byteorder != "little":
+            raise NotImplementedError("mapped tables are little-endian.")
+        self.path = Path(path)
+        with self.path.open("rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        fields = HEADER.unpack_from(self.mmap)
+        file_magic, version, typecode, self.width, self.size = fields[:5]
+        if file_magic != magic or version != VERSION:
+            self.close()
+            raise ValueError("%s is not a valid %r table." % (path, magic))
+        self.metadata = fields[5:]
+
+        self.view = memoryview(self.mmap)
+        start = HEADER.size
+        end = start + 8 * self.size
+        self.keys = self.view[start:end].cast("Q")
+        self.values = self.view[end:].cast(typecode.decode())
+
+    def find(self, key: int) -> Optional[int]:
+        """Returns the index of `key` in the table, `None` if it is missing."""
+        index = bisect_left(self.keys, key)
+        if index < self.size and self.keys[index] == key:
+            return index
+        return None
+
+    def get(self, key: int):
+        """Returns the value of `key`, or the list of its values when the table
+        is more than 1 value wide. Returns `None` if `key` is missing."""
+        index = self.find(key)
+        if index is None:
+            return None
+        if self.width == 1:
+            return self.values[index]
+        return self.values[index * self.width : (index + 1) * self.width].tolist()
+
+    def __contains__(self, key: int) -> bool:
+        return self.find(key) is not None
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        # the mapping can only be closed once no view is using it
+        for name in ("keys", "values", "view"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self.mmap.close()
+
+    def __getstate__(self):
+        # the mapping itself can't be pickled, the receiving process maps the file
+        return {"path": self.path, "magic": HEADER.unpack_from(self.mmap)[0]}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["magic"])
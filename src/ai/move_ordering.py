@@ -0,0 +1,85 @@
+"""Move ordering for alpha-beta searches.
+
+Alpha-beta prunes the most when the best move of a node is searched first. The
+columns of a node are ordered by:
+
+1. the best move stored in the transposition table for the node,
+2. the moves winning at once, then the moves blocking a win of the opponent:
+   when there are some, they are the only moves worth searching,
+3. the killer moves of the ply: moves which recently caused a cutoff in another
+   node of the same ply,
+4. the history score of the cell the move fills: the sum of the squared depths
+   of the cutoffs it caused in the whole search,
+5. the distance to the center, the most central columns first.
+"""
+from typing import List, Optional
+
+from models.board import Board
+
+KILLERS_PER_PLY = 2
+
+
+class MoveOrdering:
+    def __init__(self):
+        self.shape = None
+        self.killers: List[List[int]] = []
+        self.history = {}
+
+    def setup(self, board: Board):
+        """Resets the tables if `board` is not of the grid they were made for."""
+        shape = (board.nrows, board.ncols)
+        if shape == self.shape:
+            return
+        self.shape = shape
+        self.killers = [[] for _ in range(board.nrows * board.ncols + 1)]
+        size = board.ncols * board.stride
+        self.history = {1: [0] * size, -1: [0] * size}
+
+    def new_search(self):
+        """Forgets the killers and ages the history of the previous searches."""
+        for killers in self.killers:
+            killers.clear()
+        for history in self.history.values():
+            for index, score in enumerate(history):
+                if score:
+                    history[index] = score >> 1
+
+    def order(
+        self, board: Board, token_value: int, ply: int, tt_move: Optional[int] = None
+    ) -> List[int]:
+        """Returns the available columns of `board`, best ones first.
+
+        When `token_value` can win at once, only the winning columns are returned.
+        Otherwise, when the opponent threatens to win, only the columns blocking
+        its threats are: every other move loses at the next ply.
+        """
+        forced = board.get_winning_moves(token_value) or board.get_winning_moves(
+            -token_value
+        )
+        if forced:
+            return list(forced)
+
+        columns = board.get_available_columns()
+        first = [tt_move] if tt_move in columns else []
+        for col in self.killers[ply]:
+            if col in columns and col != tt_move:
+                first.append(col)
+        others = [col for col in columns if col not in first]
+        history = self.history[token_value]
+        stride, heights = board.stride, board.heights
+        # the sort is stable: equal scores stay center-first
+        others.sort(key=lambda col: -history[col * stride + heights[col]])
+        return first + others
+
+    def add_cutoff(
+        self, board: Board, token_value: int, col: int, ply: int, depth: int
+    ):
+        """Records that playing `col` on `board` caused a cutoff `depth` plies
+        from the leaves."""
+        killers = self.killers[ply]
+        if col not in killers:
+            killers.insert(0, col)
+            del killers[KILLERS_PER_PLY:]
+        self.history[token_value][col * board.stride + board.heights[col]] += (
+            depth * depth
+        )
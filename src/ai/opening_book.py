@@ -0,0 +1,226 @@
+"""Opening book: scores of every position of the first plies of a game.
+
+The book is generated offline, then memory-mapped by the players which find it
+and whose grid matches the book's one.
+
+A book generated with `--solver` holds the exact scores of `ai.solver`, its
+depth is 0. Every position of the book is solved, the empty grid included, so
+it is only practical on small grids: a 4x5 book takes seconds, while a 5x6 one
+doesn't finish in 15 minutes, and a 6x7 one is out of reach, see `ai.solver`.
+
+## Usage::
+
+    $ python -m ai.opening_book --plies 6 --depth 10
+    $ python -m ai.opening_book --plies 4 --solver --rows 4 --cols 5
+"""
+import argparse
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from models.board import Board
+from settings import GameSettings
+from src.logger import logger
+
+from ai.mapped_table import MappedTable, write_table
+
+MAGIC = b"C4OB"
+DEFAULT_BOOK_PATH = Path(__file__).parent / "books" / "opening_book.bin"
+
+
+class OpeningBook:
+    """Read-only opening book, memory-mapped from `path`.
+
+    Positions are keyed by `Board.get_canonical_exact_key`, so a position and its
+    mirror image share their entry, and scored from the point of view of the
+    player to play. The header tells the grid of the book, the number of
+    plies it covers and the depth of the search which scored its positions, 0
+    for exact scores.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_BOOK_PATH):
+        self.table = MappedTable(path, MAGIC)
+        metadata = self.table.metadata[:5]
+        self.nrows, self.ncols, self.winning_length, self.plies, self.depth = metadata
+
+    @classmethod
+    def load(cls, path: Union[str, Path, None] = DEFAULT_BOOK_PATH):
+        """Returns the book at `path`, or `None` if there is none."""
+        if path is None or not Path(path).exists():
+            return None
+        return cls(path)
+
+    def matches(self, board: Board) -> bool:
+        return (board.nrows, board.ncols, board.winning_length) == (
+            self.nrows,
+            self.ncols,
+            self.winning_length,
+        )
+
+    def get_score(self, board: Board, token_value: int) -> Optional[int]:
+        key, _ = board.get_canonical_exact_key(token_value)
+        return self.get(key)
+
+    def get(self, key: int) -> Optional[int]:
+        """Returns the score of the position of canonical exact key `key`."""
+        return self.table.get(key)
+
+    def best_move(self, board: Board, token_value: int) -> Optional[int]:
+        """Returns the best column for `token_value` to play, or `None` if the
+        position is not covered by the book."""
+        if not self.matches(board):
+            return None
+
+        best_score, best_move = None, None
+        for col in board.get_available_columns():
+            board.play(token_value, col)
+            try:
+                if board.winner_token_value == token_value:
+                    return col
+                if board.is_full():
+                    score = 0
+                else:
+                    score = self.get_score(board, -token_value)
+                    if score is None:
+                        return None
+                    score = -score
+            finally:
+                board.cancel_play(token_value, col)
+            if best_score is None or score > best_score:
+                best_score, best_move = score, col
+        return best_move
+
+    def close(self):
+        self.table.close()
+
+    def __len__(self):
+        return len(self.table)
+
+
+def enumerate_positions(board: Board, plies: int) -> Dict[int, List[int]]:
+    """Returns the moves leading to each non final position of at most `plies`
+    tokens, by position key. The first player plays the token value 1."""
+    positions = {}
+
+    def visit(token_value: int, moves: List[int]):
+        key, _ = board.get_canonical_exact_key(token_value)
+        if key in positions:
+            return
+        positions[key] = moves[:]
+        if len(moves) == plies:
+            return
+        for col in board.get_available_columns():
+            board.play(token_value, col)
+            if not board.is_leaf():
+                moves.append(col)
+                visit(-token_value, moves)
+                moves.pop()
+            board.cancel_play(token_value, col)
+
+    visit(1, [])
+    return positions
+
+
+searcher = None
+
+
+def score_position(args: Tuple[GameSettings, int, List[int]]) -> int:
+    """Worker task: scores the position reached by `moves` for the player to
+    play, with a search of `depth` plies, or exactly if `depth` is 0."""
+    global searcher
+    from ai.alphabeta_player import AlphaBetaPlayer
+    from ai.solver import Solver
+
+    settings, depth, moves = args
+    board = Board(settings.grid_nrows, settings.grid_ncols, settings.winning_length)
+    token_value = 1
+    for col in moves:
+        board.play(token_value, col)
+        token_value = -token_value
+
+    if depth == 0:
+        if searcher is None:
+            # the book being written can't be used to score itself
+            searcher = Solver(
+                settings.grid_nrows,
+                settings.grid_ncols,
+                settings.winning_length,
+                opening_book=None,
+            )
+        return searcher.solve(board, token_value)
+
+    if searcher is None:
+        searcher = AlphaBetaPlayer(depth=depth)
+    searcher.table.new_search()
+    score, _ = searcher.search(board, token_value, depth)
+    return int(score)
+
+
+def generate_book(
+    path: Union[str, Path],
+    settings=GameSettings(),
+    plies=6,
+    depth=10,
+    processes: Optional[int] = None,
+):
+    """Scores every position of at most `plies` tokens with a `depth` plies
+    search over `processes` workers, and writes the book to `path`. A `depth` of
+    0 scores the positions exactly with `ai.solver.Solver`."""
+    board = Board(settings.grid_nrows, settings.grid_ncols, settings.winning_length)
+    if board.ncols * board.stride > 64:
+        raise ValueError("position keys of a %r don't fit in 64 bits." % board)
+
+    positions = enumerate_positions(board, plies)
+    if depth:
+        logger.info("Scoring %d positions at depth %d", len(positions), depth)
+    else:
+        logger.info("Solving %d positions", len(positions))
+    tasks = [(settings, depth, moves) for moves in positions.values()]
+    with multiprocessing.Pool(processes) as pool:
+        scores = pool.map(score_position, tasks, chunksize=64)
+
+    write_table(
+        path,
+        MAGIC,
+        zip(positions.keys(), ((score,) for score in scores)),
+        typecode="i",
+        metadata=(
+            settings.grid_nrows,
+            settings.grid_ncols,
+            settings.winning_length,
+            plies,
+            depth,
+        ),
+    )
+    logger.info("Opening book written to %s", path)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plies", type=int, default=6)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument(
+        "--solver", action="store_true", help="exact scores, see ai.solver"
+    )
+    parser.add_argument("--rows", type=int, default=GameSettings.grid_nrows)
+    parser.add_argument("--cols", type=int, default=GameSettings.grid_ncols)
+    parser.add_argument("--length", type=int, default=GameSettings.winning_length)
+    parser.add_argument("-p", "--processes", type=int, default=None)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args(args)
+
+    logger.setLevel(logging.INFO)
+    settings = GameSettings(
+        grid_nrows=args.rows, grid_ncols=args.cols, winning_length=args.length
+    )
+    output, depth = args.output or DEFAULT_BOOK_PATH, args.depth
+    if args.solver:
+        from ai.solver import DEFAULT_SOLVER_BOOK_PATH
+
+        output, depth = args.output or DEFAULT_SOLVER_BOOK_PATH, 0
+    generate_book(output, settings, args.plies, depth, args.processes)
+
+
+if __name__ == "__main__":
+    main()
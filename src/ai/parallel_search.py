@@ -0,0 +1,200 @@
+"""Parallel root search.
+
+Each move of the root is searched by a worker of a process pool, one depth at a
+time. At each depth, the best move of the previous one is searched first with a
+full window, and its score becomes the alpha bound of the other moves. They are
+searched in parallel with a null window, which only tells whether a move beats
+that bound, and the few moves which do are searched again with a window open
+above it. Once every move has been searched to a depth, the next depth is
+started, best moves first. The move played is the best one of the deepest depth
+completed by all the moves before the deadline.
+
+The workers share a single transposition table in shared memory, so each one
+benefits from the positions already searched by the others. They also share a
+stop event: when the search ends, the tasks still running or queued return at
+once instead of delaying the next move.
+"""
+import atexit
+import multiprocessing
+from typing import Callable, Dict, List, Optional, Tuple
+
+from executor import CancelToken
+from models.board import Board
+from src.logger import logger
+
+from ai.search import Deadline, SearchResult
+from ai.transposition import SharedTranspositionTable
+
+infty = float("inf")
+
+# How often the pool results are polled for the deadline
+POLL_SECS = 0.005
+
+searcher = None
+
+
+def init_searcher(depth: int, table: SharedTranspositionTable, stop, log_level: int):
+    global searcher
+    from ai.alphabeta_player import AlphaBetaPlayer
+
+    logger.setLevel(log_level)
+    # the table of the player is replaced by the shared one
+    searcher = AlphaBetaPlayer(depth=depth, tt_bytes=0, opening_book=None)
+    searcher.table = table
+    searcher.set_cancel_token(CancelToken(stop))
+
+
+def search_move(
+    board: Board,
+    token_value: int,
+    col: int,
+    depth: int,
+    end: Optional[float],
+    alpha: float,
+    beta: float,
+) -> Optional[Tuple[int, int, int, int]]:
+    """Worker task, see `AlphaBetaPlayer.search_move`."""
+    deadline = Deadline.until(end, searcher.cancel_token)
+    return searcher.search_move(board, token_value, col, depth, deadline, alpha, beta)
+
+
+class ParallelSearch:
+    """Pool of `workers` processes searching root moves with `AlphaBetaPlayer`s of
+    maximum depth `depth`, sharing a transposition table of `tt_bytes`."""
+
+    def __init__(self, workers: int, depth: int, tt_bytes: int, tt_policy: str):
+        self.workers = workers
+        self.table = SharedTranspositionTable(max_bytes=tt_bytes, policy=tt_policy)
+        self.stop = multiprocessing.Event()
+        self.tasks = []
+        self.pool = multiprocessing.Pool(
+            workers,
+            initializer=init_searcher,
+            initargs=(depth, self.table, self.stop, logger.level),
+        )
+        atexit.register(self.close)
+
+    def search(
+        self,
+        board: Board,
+        token_value: int,
+        max_depth: int,
+        deadline: Deadline,
+        is_final: Callable[[float], bool] = lambda score: False,
+    ) -> SearchResult:
+        self.table.new_search()
+        result = SearchResult()
+        columns = list(board.get_available_columns())
+        try:
+            for depth in range(1, max_depth + 1):
+                scores = self.search_depth(
+                    board, token_value, columns, depth, deadline, result
+                )
+                if scores is None:
+                    break
+
+                columns.sort(key=lambda col: scores[col], reverse=True)
+                result.move, result.depth = columns[0], depth
+                result.score = scores[result.move]
+                if is_final(result.score) or deadline.expired():
+                    break
+        finally:
+            self.stop_tasks()
+
+        result.elapsed = deadline.elapsed()
+        logger.info(
+            "Search reached depth %d in %.3fs (%d nodes, %d nodes/s, %d workers)",
+            result.depth,
+            result.elapsed,
+            result.nodes,
+            result.nodes_per_sec,
+            self.workers,
+        )
+        return result
+
+    def search_depth(
+        self,
+        board: Board,
+        token_value: int,
+        columns: List[int],
+        depth: int,
+        deadline: Deadline,
+        result: SearchResult,
+    ) -> Optional[Dict[int, float]]:
+        """Returns the scores of `columns` searched `depth` plies deep, or `None`
+        if `deadline` expires first. Only the score of the best column is exact,
+        the others are upper bounds of theirs."""
+        first = self.submit(board, token_value, columns[0], depth, deadline)
+        alpha = self.wait(first, deadline, result)
+        if alpha is None:
+            return None
+        scores = {columns[0]: alpha}
+
+        window_alpha = alpha
+        tasks = [
+            self.submit(board, token_value, col, depth, deadline, alpha, alpha + 1)
+            for col in columns[1:]
+        ]
+        for col, task in zip(columns[1:], tasks):
+            score = self.wait(task, deadline, result)
+            if score is None:
+                return None
+            if score > window_alpha:
+                # fail-high: the move may beat the best one, get its exact score
+                task = self.submit(board, token_value, col, depth, deadline, alpha)
+                score = self.wait(task, deadline, result)
+                if score is None:
+                    return None
+                alpha = max(alpha, score)
+            scores[col] = score
+        return scores
+
+    def submit(
+        self,
+        board: Board,
+        token_value: int,
+        col: int,
+        depth: int,
+        deadline: Deadline,
+        alpha: float = -infty,
+        beta: float = infty,
+    ):
+        task = self.pool.apply_async(
+            search_move, (board, token_value, col, depth, deadline.end, alpha, beta)
+        )
+        self.tasks.append(task)
+        return task
+
+    @staticmethod
+    def wait(task, deadline: Deadline, result: SearchResult) -> Optional[float]:
+        """Returns the score of `task` and adds its statistics to `result`, or
+        returns `None` if `deadline` expires first."""
+        while not task.ready():
+            if deadline.expired():
+                return None
+            task.wait(POLL_SECS)
+        outcome = task.get()
+        if outcome is None:
+            return None
+        score, nodes, probes, hits = outcome
+        result.nodes += nodes
+        result.probes += probes
+        result.hits += hits
+        return score
+
+    def stop_tasks(self):
+        """Makes the tasks still running or queued return at once, and waits for
+        them so that none is left running when the next search starts."""
+        self.stop.set()
+        for task in self.tasks:
+            task.wait()
+        self.tasks = []
+        self.stop.clear()
+
+    def close(self):
+        if self.pool is None:
+            return
+        self.pool.terminate()
+        self.pool = None
+        self.table.close()
+        self.table.unlink()
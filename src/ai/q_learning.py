@@ -0,0 +1,236 @@
+"""Q-learning by self-play.
+
+Both players share the same Q-table: `Q(position, col)` is the value, for the
+player to play, of playing `col` in `position`, 1 being a win and -1 a loss.
+Once a game is over, the Q-value of each of its moves is moved towards the
+outcome of the game for the player of the move, discounted by the number of
+moves left: a win of the last move scores 1 for it, `-discount` for the move of
+the opponent before it, `discount ** 2` for the one before, and so on. These
+Monte Carlo returns reach the opening moves from the first games on, which
+bootstrapping each move on the next one would only do once every position of
+the game has been met again. The updates of the games of a batch ending on the
+same position and move are averaged into one.
+
+Positions are keyed by `Board.get_canonical_exact_key`: a position and its mirror
+image share the row of Q-values of the canonical one, whose columns are mirrored
+for the other. The trained table is saved as a `QTable`, see `ai.q_table`.
+
+## Usage::
+
+    $ python -m ai.q_learning --games 100000
+"""
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from models.board import Board
+from models.board_batch import BoardBatch
+from settings import GameSettings
+from src.logger import logger
+
+from ai.mapped_table import write_table
+from ai.q_table import DEFAULT_Q_TABLE_PATH, MAGIC, QTable
+
+
+class TrainingTable:
+    """Growable Q-table used during training: a dict maps each position key to
+    its row in a float32 array of Q-values."""
+
+    def __init__(self, ncols: int, capacity=2**16):
+        self.ncols = ncols
+        self.rows = {}
+        self.values = np.zeros((capacity, ncols), dtype=np.float32)
+
+    @classmethod
+    def from_q_table(cls, q_table: QTable) -> "TrainingTable":
+        table = cls(q_table.ncols, max(len(q_table), 1))
+        keys = q_table.table.keys.tolist()
+        table.rows = dict(zip(keys, range(len(keys))))
+        table.values[: len(keys)] = np.asarray(q_table.table.values).reshape(
+            -1, q_table.ncols
+        )
+        return table
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """Returns the rows of `keys`, adding the missing ones with Q-values 0."""
+        rows = self.rows
+        indexes = np.fromiter(
+            (rows.setdefault(key, len(rows)) for key in keys.tolist()),
+            dtype=np.intp,
+            count=len(keys),
+        )
+        if len(rows) > len(self.values):
+            values = np.zeros((2 * len(rows), self.ncols), dtype=np.float32)
+            values[: len(self.values)] = self.values
+            self.values = values
+        return indexes
+
+    def update(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        targets: np.ndarray,
+        learning_rate: float,
+    ):
+        """Moves the Q-values of `(rows, cols)` towards `targets`. The targets of a
+        same row and column are averaged, instead of all but one being lost."""
+        cells, inverse, counts = np.unique(
+            rows * self.ncols + cols, return_inverse=True, return_counts=True
+        )
+        values = self.values.reshape(-1)
+        means = np.bincount(inverse, weights=targets, minlength=len(cells)) / counts
+        values[cells] += learning_rate * (means - values[cells])
+
+    def save(self, path: Union[str, Path], board: Board, games: int):
+        write_table(
+            path,
+            MAGIC,
+            ((key, self.values[row].tolist()) for key, row in self.rows.items()),
+            typecode="f",
+            width=self.ncols,
+            metadata=(board.nrows, board.ncols, board.winning_length, games),
+        )
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def train(
+    games: int,
+    settings=GameSettings(),
+    table: Optional[TrainingTable] = None,
+    batch_size=1024,
+    learning_rate=0.1,
+    discount=0.95,
+    epsilon=0.1,
+    seed: Optional[int] = None,
+) -> TrainingTable:
+    """Plays `games` self-play games, `batch_size` of them at a time, and returns
+    the updated Q-table. Moves are greedy, except with probability `epsilon`
+    where a random move is played instead."""
+    board = Board(settings.grid_nrows, settings.grid_ncols, settings.winning_length)
+    if board.ncols * board.stride > 64:
+        raise ValueError("position keys of a %r don't fit in 64 bits." % board)
+    if table is None:
+        table = TrainingTable(board.ncols)
+    rng = np.random.default_rng(seed)
+    columns = np.arange(board.ncols)
+
+    batch = BoardBatch(
+        min(batch_size, games), board.nrows, board.ncols, board.winning_length
+    )
+    keys, board_mirrored = batch.get_canonical_exact_keys()
+    board_rows = table.lookup(keys)
+    started = len(batch)
+    # rows and canonical columns of the moves played so far in each game
+    capacity = board.nrows * board.ncols
+    played_rows = np.zeros((len(batch), capacity), dtype=np.intp)
+    played_cols = np.zeros((len(batch), capacity), dtype=np.intp)
+    plies = np.arange(capacity)
+    # return of a win, for the player of the move `k` moves before the last one
+    returns = (-discount) ** plies
+    while not batch.done.all():
+        active = np.flatnonzero(~batch.done)
+        rows, mirrored = board_rows[active], board_mirrored[active]
+        # columns of the canonical position matching the columns of each board
+        mirror = np.where(mirrored[:, np.newaxis], columns[::-1], columns)
+        legal = batch.legal_moves()[active]
+        values = table.values[rows[:, np.newaxis], mirror]
+        # random tie-breaks, or every untried position would start on column 0
+        values = values + rng.random(legal.shape, dtype=np.float32) * 1e-6
+        cols = np.where(legal, values, -np.inf).argmax(axis=1)
+        explore = rng.random(len(active)) < epsilon
+        random_cols = (rng.random(legal.shape) * legal).argmax(axis=1)
+        cols = np.where(explore, random_cols, cols)
+
+        nmoves = batch.nmoves[active]
+        played_rows[active, nmoves] = rows
+        played_cols[active, nmoves] = mirror[np.arange(len(active)), cols]
+        all_cols = np.zeros(len(batch), dtype=np.intp)
+        all_cols[active] = cols
+        batch.play(all_cols)
+
+        done = batch.done[active]
+        ongoing = active[~done]
+        if len(ongoing):
+            keys, board_mirrored[ongoing] = batch.get_canonical_exact_keys(ongoing)
+            board_rows[ongoing] = table.lookup(keys)
+
+        finished = active[done]
+        if len(finished):
+            nmoves = batch.nmoves[finished, np.newaxis]
+            moves = plies < nmoves
+            moves_left = np.maximum(nmoves - 1 - plies, 0)
+            # a finished game was won by the last player, or is a draw
+            won = batch.winners[finished, np.newaxis] != 0
+            targets = np.where(won, returns[moves_left], 0.0)
+            table.update(
+                played_rows[finished][moves],
+                played_cols[finished][moves],
+                targets[moves],
+                learning_rate,
+            )
+
+            finished = finished[: games - started]
+            batch.reset(finished)
+            keys, board_mirrored[finished] = batch.get_canonical_exact_keys(finished)
+            board_rows[finished] = table.lookup(keys)
+            started += len(finished)
+
+    return table
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--games", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--learning-rate", type=float, default=0.1)
+    parser.add_argument("--discount", type=float, default=0.95)
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--resume", action="store_true", help="train the saved table")
+    parser.add_argument("--rows", type=int, default=GameSettings.grid_nrows)
+    parser.add_argument("--cols", type=int, default=GameSettings.grid_ncols)
+    parser.add_argument("--length", type=int, default=GameSettings.winning_length)
+    parser.add_argument("-o", "--output", default=DEFAULT_Q_TABLE_PATH)
+    args = parser.parse_args(args)
+
+    logger.setLevel(logging.INFO)
+    settings = GameSettings(
+        grid_nrows=args.rows, grid_ncols=args.cols, winning_length=args.length
+    )
+    board = Board(settings.grid_nrows, settings.grid_ncols, settings.winning_length)
+    table, games = None, 0
+    if args.resume:
+        q_table = QTable.load(args.output)
+        if q_table is not None and q_table.matches(board):
+            table, games = TrainingTable.from_q_table(q_table), q_table.games
+            q_table.close()
+
+    start = time.perf_counter()
+    table = train(
+        args.games,
+        settings,
+        table,
+        batch_size=args.batch_size,
+        learning_rate=args.learning_rate,
+        discount=args.discount,
+        epsilon=args.epsilon,
+        seed=args.seed,
+    )
+    logger.info(
+        "Trained on %d games in %.1fs, %d positions",
+        args.games,
+        time.perf_counter() - start,
+        len(table),
+    )
+    table.save(args.output, board, games + args.games)
+    logger.info("Q-table written to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
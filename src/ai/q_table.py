@@ -0,0 +1,53 @@
+"""Q-table learned by `ai.q_learning` and played by `RLPlayer`: a `MappedTable`
+holding one row of `ncols` Q-values per position.
+
+It is kept apart from the training, which `ai` doesn't import, so that
+`python -m ai.q_learning` runs the training module only once.
+"""
+from pathlib import Path
+from typing import Union
+
+from models.board import Board
+
+from ai.mapped_table import MappedTable
+
+MAGIC = b"C4QT"
+DEFAULT_Q_TABLE_PATH = Path(__file__).parent / "tables" / "q_table.bin"
+
+
+class QTable:
+    """Read-only Q-table, memory-mapped from `path`."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_Q_TABLE_PATH):
+        self.table = MappedTable(path, MAGIC)
+        metadata = self.table.metadata[:4]
+        self.nrows, self.ncols, self.winning_length, self.games = metadata
+
+    @classmethod
+    def load(cls, path: Union[str, Path, None] = DEFAULT_Q_TABLE_PATH):
+        """Returns the Q-table at `path`, or `None` if there is none."""
+        if path is None or not Path(path).exists():
+            return None
+        return cls(path)
+
+    def matches(self, board: Board) -> bool:
+        return (board.nrows, board.ncols, board.winning_length) == (
+            self.nrows,
+            self.ncols,
+            self.winning_length,
+        )
+
+    def get(self, board: Board, token_value: int):
+        """Returns the Q-values of each column for `token_value` to play, or `None`
+        if the position was never met during training."""
+        key, mirrored = board.get_canonical_exact_key(token_value)
+        values = self.table.get(key)
+        if values is not None and mirrored:
+            values.reverse()
+        return values
+
+    def close(self):
+        self.table.close()
+
+    def __len__(self):
+        return len(self.table)
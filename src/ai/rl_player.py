@@ -1,13 +1,38 @@
 from models.board import Board
 from models.player import Player
 
-infty = float("inf")
+from ai.q_table import DEFAULT_Q_TABLE_PATH, QTable
 
 
 class RLPlayer(Player):
-    def __init__(self, name="MY_AI_NAME"):
+    """Plays the move of highest Q-value learned by self-play, see `ai.q_learning`.
+
+    Args
+    ----
+        q_table: `str` or `Path`\n
+            Q-table trained for the grid of the game. Positions missing from it,
+            or a missing Q-table, make the player fall back on the most central
+            column available.
+    """
+
+    def __init__(self, name="RL", q_table=DEFAULT_Q_TABLE_PATH):
         super().__init__(name)
+        self.q_table_path = q_table
+        self.q_table = None
 
     def strategy(self, board: Board):
-        # TODO
-        pass
+        columns = board.get_available_columns()
+        values = self.get_q_values(board)
+        if values is None:
+            return columns[0]
+        return max(columns, key=lambda col: values[col])
+
+    def get_q_values(self, board: Board):
+        # the table is mapped by the process playing, not pickled with the player
+        if self.q_table is None and self.q_table_path is not None:
+            self.q_table = QTable.load(self.q_table_path)
+            if self.q_table is None:
+                self.q_table_path = None
+        if self.q_table is None or not self.q_table.matches(board):
+            return None
+        return self.q_table.get(board, self.token.value)
@@ -0,0 +1,136 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from src.logger import logger
+
+# Share of `GameSettings.timeout_secs` a search may use. The remaining time is
+# left for the game loop to get the move back before the timeout.
+TIME_RATIO = 0.8
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Deadline:
+    """Point in time after which a search must stop. `None` seconds means the
+    search is only interrupted when its `cancel_token` is cancelled."""
+
+    def __init__(self, seconds: Union[float, None], cancel_token=None):
+        self.start = time.perf_counter()
+        self.end = None if seconds is None else self.start + seconds
+        self.cancel_token = cancel_token
+
+    @classmethod
+    def from_settings(cls, settings, cancel_token=None, ratio=TIME_RATIO):
+        timeout_secs = getattr(settings, "timeout_secs", None)
+        return cls(timeout_secs * ratio if timeout_secs else None, cancel_token)
+
+    @classmethod
+    def until(cls, end: Union[float, None], cancel_token=None):
+        """Deadline at the `time.perf_counter()` value `end`, which is shared by
+        the processes of the machine."""
+        deadline = cls(None, cancel_token)
+        deadline.end = end
+        return deadline
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def expired(self) -> bool:
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            return True
+        return self.end is not None and time.perf_counter() >= self.end
+
+    def check(self):
+        if self.expired():
+            raise SearchTimeout()
+
+
+@dataclass
+class SearchResult:
+    move: Optional[int] = None
+    score: float = 0
+    depth: int = 0
+    nodes: int = 0
+    elapsed: float = 0.0
+    # transposition table lookups, and the ones which found their position
+    probes: int = 0
+    hits: int = 0
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    @property
+    def branching_factor(self) -> float:
+        """Effective branching factor: the number of children per node of a
+        uniform tree of `depth` plies with as many nodes as the search."""
+        if not self.depth or not self.nodes:
+            return 0.0
+        return self.nodes ** (1 / self.depth)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the statistics of the search, as reported by the game."""
+        return {
+            "depth": self.depth,
+            "score": self.score,
+            "nodes": self.nodes,
+            "elapsed": self.elapsed,
+            "nodes_per_sec": self.nodes_per_sec,
+            "tt_hit_rate": self.tt_hit_rate,
+            "branching_factor": self.branching_factor,
+        }
+
+
+def iterative_deepening(
+    search: Callable[[int], Tuple[float, int]],
+    max_depth: int,
+    deadline: Deadline,
+    is_final: Callable[[float], bool] = lambda score: False,
+    count_nodes: Callable[[], int] = lambda: 0,
+) -> SearchResult:
+    """Runs `search(depth)` for depth 1, 2, ... up to `max_depth`, and returns the
+    result of the last depth completed before `deadline`.
+
+    Args
+    ----
+        search: `(depth) -> (score, move)`\n
+            Depth-limited search. It must call `deadline.check()` regularly, the
+            `SearchTimeout` it raises aborts the current depth.
+        is_final: `(score) -> bool`\n
+            Tells whether a score is proven (a win or a loss), in which case
+            searching deeper is useless.
+        count_nodes: `() -> int`\n
+            Number of nodes searched so far, reported in the result.
+
+    Returns
+    -------
+        result: `SearchResult`\n
+            `result.move` is `None` if not even depth 1 could be completed.
+    """
+    result = SearchResult()
+    for depth in range(1, max_depth + 1):
+        try:
+            score, move = search(depth)
+        except SearchTimeout:
+            break
+        result.move, result.score, result.depth = move, score, depth
+        if is_final(score) or deadline.expired():
+            break
+
+    result.nodes = count_nodes()
+    result.elapsed = deadline.elapsed()
+    logger.info(
+        "Search reached depth %d in %.3fs (%d nodes, %d nodes/s)",
+        result.depth,
+        result.elapsed,
+        result.nodes,
+        result.nodes_per_sec,
+    )
+    return result
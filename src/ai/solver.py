@@ -0,0 +1,458 @@
+"""Exact solver: game-theoretic scores and perfect play.
+
+Scores follow the convention of Pascal Pons' connect 4 solver. A draw scores 0.
+A win scores the number of cells left empty by the winner plus one, halved:
+`(capacity + 1 - moves) // 2` when the winning token is the `moves + 1`-th one
+played. Losses score the opposite. Winning sooner and losing later scores more.
+
+The search is a negamax on bitboards (see `models.board.Board`) which only
+tries the moves not losing at once, threatening moves first. The score of a
+position is narrowed by null-window searches, each one only telling whether the
+score is above a value, which prune much more than full-window searches. The
+results are kept in a transposition table, and an exact opening book (generated
+with `python -m ai.opening_book --solver`) covers the first plies when present.
+
+Being pure Python, the solver is far slower than Pons' one: on the 6x7 grid, a
+position takes under a second to solve from about 20 tokens on, tens of seconds
+around 10 to 12 tokens and minutes or more before. An opening book solves the
+empty grid too, so it can only be built for small grids.
+
+## Usage::
+
+    $ python -m ai.solver 4453
+"""
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from models.board import Board
+from models.player import Player
+from src.logger import logger
+
+from ai.opening_book import OpeningBook
+from ai.search import Deadline, SearchResult, SearchTimeout
+from ai.transposition import (
+    DEPTH_PREFERRED,
+    LOWER_BOUND,
+    UPPER_BOUND,
+    TranspositionTable,
+)
+
+DEFAULT_SOLVER_BOOK_PATH = Path(__file__).parent / "books" / "solver_book.bin"
+
+# Bits of the keys mirrored by a single lookup, see `Solver.mirror_key`
+MIRROR_CHUNK_BITS = 14
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def half(score: int) -> int:
+    """Halves `score`, rounding towards 0."""
+    return -(-score // 2) if score < 0 else score // 2
+
+
+class Solver:
+    """Solves the positions of a grid.
+
+    Positions are given to the search as two bitboards: `current`, the tokens of
+    the player to play, and `mask`, all the tokens, along with the number of
+    `moves` played.
+
+    Args
+    ----
+        tt_bytes: `int`\n
+            Memory budget of the transposition table, kept from one solve to the
+            next.
+        opening_book: `str` or `Path`\n
+            Exact opening book of the grid, see `ai.opening_book`. Ignored if the
+            file does not exist or if its scores come from a depth-limited
+            search.
+    """
+
+    def __init__(
+        self,
+        nrows=6,
+        ncols=7,
+        winning_length=4,
+        tt_bytes=64 * 2**20,
+        opening_book=DEFAULT_SOLVER_BOOK_PATH,
+    ):
+        # the board only provides the geometry of the bitboards
+        self.geometry = Board(nrows, ncols, winning_length)
+        self.nrows, self.ncols = nrows, ncols
+        self.winning_length = winning_length
+        self.capacity = nrows * ncols
+        self.stride = self.geometry.stride
+        self.bottom_mask = self.geometry.bottom_mask
+        self.grid_mask = self.geometry.grid_mask
+        self.column_masks = tuple(
+            ((1 << nrows) - 1) << (col * self.stride) for col in range(ncols)
+        )
+        self.center_order = self.geometry.center_order
+        # shifts from a cell to the next `winning_length - 1` ones of each
+        # horizontal or diagonal direction, see `winning_cells`
+        self.line_shifts = tuple(
+            tuple(k * step for k in range(1, winning_length))
+            for step in (self.stride, self.stride + 1, self.stride - 1)
+        )
+        self.mirror_chunks = self.get_mirror_chunks()
+        self.table = TranspositionTable(max_bytes=tt_bytes, policy=DEPTH_PREFERRED)
+        self.book = OpeningBook.load(opening_book)
+        if self.book is not None and (
+            not self.book.matches(self.geometry) or self.book.depth != 0
+        ):
+            self.book = None
+        self.deadline = Deadline(None)
+        self.nodes = 0
+
+    def matches(self, board: Board) -> bool:
+        return (board.nrows, board.ncols, board.winning_length) == (
+            self.nrows,
+            self.ncols,
+            self.winning_length,
+        )
+
+    def winning_cells(self, position: int, mask: int) -> int:
+        """Returns the empty cells which would complete an alignment of the
+        tokens `position`, whether they can be played now or not."""
+        # a vertical alignment can only miss its top token
+        cells = -1
+        for shift in range(1, self.winning_length):
+            cells &= position << shift
+        for shifts in self.line_shifts:
+            # `befores[k]`: the cells with `k + 1` tokens right before them in the
+            # direction, `afters[k]`: right after them
+            befores, afters = [], []
+            before = after = -1
+            for shift in shifts:
+                before &= position << shift
+                after &= position >> shift
+                befores.append(before)
+                afters.append(after)
+            cells |= before | after
+            last = len(shifts) - 1
+            for k in range(last):
+                cells |= befores[k] & afters[last - 1 - k]
+        return cells & (self.grid_mask ^ mask)
+
+    def non_losing_moves(self, current: int, mask: int) -> int:
+        """Returns the playable cells after which the opponent can't win at once,
+        0 if there are none."""
+        possible = (mask + self.bottom_mask) & self.grid_mask
+        opponent_wins = self.winning_cells(current ^ mask, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return 0  # two threats can't both be blocked
+            possible = forced
+        # playing below a cell completing an alignment of the opponent gives it
+        return possible & ~(opponent_wins >> 1)
+
+    def can_win_next(self, current: int, mask: int) -> bool:
+        possible = (mask + self.bottom_mask) & self.grid_mask
+        return bool(self.winning_cells(current, mask) & possible)
+
+    def get_mirror_chunks(self) -> List[Tuple[int, int, List[int]]]:
+        """Returns the `(shift, mask, mirrors)` of the chunks of whole columns the
+        keys are split into: `mirrors[value]` is the mirror image of the chunk
+        `value << shift`. Empty if a single column is too large for a table."""
+        columns = MIRROR_CHUNK_BITS // self.stride
+        if not columns:
+            return []
+        chunks = []
+        for col in range(0, self.ncols, columns):
+            shift = col * self.stride
+            bits = min(columns, self.ncols - col) * self.stride
+            mirrors = [
+                self.geometry.mirror_mask(value << shift) for value in range(1 << bits)
+            ]
+            chunks.append((shift, (1 << bits) - 1, mirrors))
+        return chunks
+
+    def mirror_key(self, key: int) -> int:
+        """Returns `key` with its columns in reverse order, by table lookups."""
+        if not self.mirror_chunks:
+            return self.geometry.mirror_mask(key)
+        mirrored = 0
+        for shift, chunk_mask, mirrors in self.mirror_chunks:
+            mirrored |= mirrors[key >> shift & chunk_mask]
+        return mirrored
+
+    def get_canonical_key(self, current: int, mask: int) -> Tuple[int, bool]:
+        """Returns the smallest of the keys of the position and of its mirror
+        image, and whether it is the one of the mirror image, as
+        `Board.get_canonical_exact_key`."""
+        key = current + mask + self.bottom_mask
+        mirrored_key = self.mirror_key(key)
+        if mirrored_key < key:
+            return mirrored_key, True
+        return key, False
+
+    def get_book_score(self, current: int, mask: int) -> Optional[int]:
+        return self.book.get(self.get_canonical_key(current, mask)[0])
+
+    def solve(
+        self, board: Board, token_value: int, deadline: Optional[Deadline] = None
+    ) -> int:
+        """Returns the score of `board` for `token_value` to play. Raises a
+        `SearchTimeout` if `deadline` expires first."""
+        if board.is_leaf():
+            raise ValueError("the game is over.")
+        mask = board.masks[1] | board.masks[-1]
+        moves = self.capacity - board.capacity
+        self.deadline = deadline or Deadline(None)
+        return self.solve_position(board.masks[token_value], mask, moves)
+
+    def solve_position(self, current: int, mask: int, moves: int) -> int:
+        if self.can_win_next(current, mask):
+            return (self.capacity + 1 - moves) // 2
+        if self.book is not None and moves <= self.book.plies:
+            score = self.get_book_score(current, mask)
+            if score is not None:
+                return score
+
+        low = -((self.capacity - moves) // 2)
+        high = (self.capacity + 1 - moves) // 2
+        while low < high:
+            # null windows near 0 first: most positions score close to it
+            middle = low + (high - low) // 2
+            if middle <= 0 and half(low) < middle:
+                middle = half(low)
+            elif middle >= 0 and half(high) > middle:
+                middle = half(high)
+            score = self.negamax(current, mask, moves, middle, middle + 1)
+            if score <= middle:
+                high = score
+            else:
+                low = score
+        return low
+
+    def analyze(
+        self, board: Board, token_value: int, deadline: Optional[Deadline] = None
+    ) -> Dict[int, int]:
+        """Returns the score of each available column for `token_value`, by
+        column, center-first."""
+        if board.is_leaf():
+            raise ValueError("the game is over.")
+        self.deadline = deadline or Deadline(None)
+        current = board.masks[token_value]
+        mask = board.masks[1] | board.masks[-1]
+        moves = self.capacity - board.capacity
+        scores = {}
+        for col in board.get_available_columns():
+            move = (mask + self.bottom_mask) & self.column_masks[col]
+            if self.winning_cells(current, mask) & move:
+                scores[col] = (self.capacity + 1 - moves) // 2
+            elif moves + 1 == self.capacity:
+                scores[col] = 0
+            else:
+                scores[col] = -self.solve_position(
+                    current ^ mask, mask | move, moves + 1
+                )
+        return scores
+
+    def negamax(self, current: int, mask: int, moves: int, alpha: int, beta: int):
+        """Returns the score of the position if it is within `(alpha, beta)`, an
+        upper bound if it is below and a lower bound if it is above. The player
+        to play must not be able to win at once."""
+        self.nodes += 1
+        if not self.nodes & 0xFFF:
+            self.deadline.check()
+
+        possible = self.non_losing_moves(current, mask)
+        if not possible:
+            return -((self.capacity - moves) // 2)
+        if moves >= self.capacity - 2:
+            return 0
+
+        # the opponent can't win with its next token, nor the player with this one
+        low = -((self.capacity - 2 - moves) // 2)
+        if alpha < low:
+            alpha = low
+            if alpha >= beta:
+                return alpha
+        high = (self.capacity - 1 - moves) // 2
+
+        # mirror images share their entry, its move is stored for the canonical one
+        key, mirrored = self.get_canonical_key(current, mask)
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            _, _, bound, score, tt_move, _ = entry
+            if mirrored and tt_move is not None:
+                tt_move = self.geometry.mirror_column(tt_move)
+            if bound != UPPER_BOUND and score > low:
+                low = score
+                if alpha < low:
+                    alpha = low
+                    if alpha >= beta:
+                        return alpha
+            if bound != LOWER_BOUND and score < high:
+                high = score
+        if beta > high:
+            beta = high
+            if alpha >= beta:
+                return beta
+        if self.book is not None and moves <= self.book.plies:
+            score = self.get_book_score(current, mask)
+            if score is not None:
+                return score
+
+        for col, move in self.order_moves(current, mask, possible, tt_move):
+            score = -self.negamax(current ^ mask, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                if mirrored:
+                    col = self.geometry.mirror_column(col)
+                self.table.store(key, self.capacity - moves, LOWER_BOUND, score, col)
+                return score
+            if score > alpha:
+                alpha = score
+        self.table.store(key, self.capacity - moves, UPPER_BOUND, alpha, None)
+        return alpha
+
+    def order_moves(self, current: int, mask: int, possible: int, tt_move=None):
+        """Returns the `(column, move)` of the cells of `possible`: the move of the
+        transposition table first, then the ones creating the most threats,
+        center-first."""
+        moves = []
+        for col in self.center_order:
+            move = possible & self.column_masks[col]
+            if move:
+                threats = popcount(self.winning_cells(current | move, mask))
+                moves.append((threats + 1000 * (col == tt_move), col, move))
+        # the sort is stable: equal scores stay center-first
+        moves.sort(key=lambda item: -item[0])
+        return [(col, move) for _, col, move in moves]
+
+
+class SolverPlayer(Player):
+    """Plays perfectly: the column of best score of `Solver`, the most central one
+    among equals.
+
+    On a 6x7 grid, positions of fewer than about 14 tokens take tens of seconds
+    or more to solve: when the time budget given by `GameSettings.timeout_secs` runs out,
+    the player falls back on the most promising column not losing at once.
+
+    Args
+    ----
+        tt_bytes: `int`\n
+            Memory budget of the transposition table of the solver.
+        opening_book: `str` or `Path`\n
+            Exact opening book, see `Solver`.
+    """
+
+    def __init__(
+        self,
+        name="Solver",
+        tt_bytes=64 * 2**20,
+        opening_book=DEFAULT_SOLVER_BOOK_PATH,
+    ):
+        super().__init__(name)
+        self.tt_bytes = tt_bytes
+        self.opening_book_path = opening_book
+        self.solver = None
+
+    def __getstate__(self):
+        # the solver maps its book, each process builds its own
+        state = self.__dict__.copy()
+        state["solver"] = None
+        return state
+
+    def get_solver(self, board: Board) -> Solver:
+        if self.solver is None or not self.solver.matches(board):
+            self.solver = Solver(
+                board.nrows,
+                board.ncols,
+                board.winning_length,
+                tt_bytes=self.tt_bytes,
+                opening_book=self.opening_book_path,
+            )
+        return self.solver
+
+    def strategy(self, board: Board):
+        solver = self.get_solver(board)
+        solver.table.new_search()
+        solver.nodes = 0
+        deadline = Deadline.from_settings(self.settings, self.cancel_token)
+        self.last_search = SearchResult()
+        try:
+            scores = solver.analyze(board, self.token.value, deadline)
+        except SearchTimeout:
+            move = self.get_fallback_move(solver, board)
+        else:
+            move = max(scores, key=lambda col: scores[col])
+            self.last_search.score = scores[move]
+            self.last_search.depth = board.capacity
+        self.last_search.move = move
+        self.last_search.nodes = solver.nodes
+        self.last_search.elapsed = deadline.elapsed()
+        self.last_search.probes = solver.table.probes
+        self.last_search.hits = solver.table.hits
+        return move
+
+    def get_fallback_move(self, solver: Solver, board: Board) -> int:
+        current = board.masks[self.token.value]
+        mask = board.masks[1] | board.masks[-1]
+        for col in board.get_available_columns():
+            if board.is_winning_move(self.token.value, col):
+                return col
+        possible = solver.non_losing_moves(current, mask)
+        for col, _ in solver.order_moves(current, mask, possible):
+            return col
+        return board.get_available_columns()[0]
+
+
+def parse_moves(moves: str, board: Board) -> int:
+    """Plays `moves`, a string of 1-based columns, on `board`. Returns the token
+    value to play next."""
+    token_value = 1
+    for char in moves:
+        col = int(char) - 1
+        if board.is_leaf() or board.play(token_value, col) == -1:
+            raise ValueError("invalid moves %r." % moves)
+        token_value = -token_value
+    return token_value
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "moves", nargs="?", default="", help="1-based columns played, ex: 4453"
+    )
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=7)
+    parser.add_argument("--length", type=int, default=4)
+    parser.add_argument("--book", default=DEFAULT_SOLVER_BOOK_PATH)
+    args = parser.parse_args(args)
+
+    logger.setLevel(logging.WARNING)
+    board = Board(args.rows, args.cols, args.length)
+    try:
+        token_value = parse_moves(args.moves, board)
+    except ValueError as error:
+        parser.error(str(error))
+    if board.is_leaf():
+        parser.error("the game is over.")
+    solver = Solver(args.rows, args.cols, args.length, opening_book=args.book)
+    start = time.perf_counter()
+    scores = solver.analyze(board, token_value)
+    elapsed = time.perf_counter() - start
+
+    columns: List[str] = []
+    for col in range(board.ncols):
+        columns.append("%d" % scores[col] if col in scores else "-")
+    print("column: " + " ".join("%3d" % (col + 1) for col in range(board.ncols)))
+    print("score:  " + " ".join("%3s" % score for score in columns))
+    best = max(scores, key=lambda col: scores[col])
+    print(
+        "best column %d, score %d | %d nodes in %.3fs"
+        % (best + 1, scores[best], solver.nodes, elapsed)
+    )
+
+
+if __name__ == "__main__":
+    main()
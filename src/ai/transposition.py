@@ -0,0 +1,222 @@
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Bound types of a stored score
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Replacement policies
+DEPTH_PREFERRED = "depth"
+ALWAYS_REPLACE = "always"
+
+# Rough size of an entry: a tuple of 6 small ints and its slot in the list.
+ENTRY_BYTES = 120
+
+# (key, depth, bound, score, move, generation)
+Entry = Tuple[int, int, int, int, int, int]
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results keyed by Zobrist hashes.
+
+    Args
+    ----
+        max_bytes: `int`\n
+            Memory budget of the table. The number of buckets is derived from it.
+        policy: `str`, `DEPTH_PREFERRED` or `ALWAYS_REPLACE`\n
+            With `DEPTH_PREFERRED` each bucket holds 2 entries: the first one is
+            only replaced by deeper (or older) results, the second one always is.
+            With `ALWAYS_REPLACE` each bucket holds a single entry, replaced by
+            every new result.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, policy=DEPTH_PREFERRED):
+        if policy not in (DEPTH_PREFERRED, ALWAYS_REPLACE):
+            raise ValueError("unknown replacement policy %r." % policy)
+        self.policy = policy
+        self.bucket_size = 2 if policy == DEPTH_PREFERRED else 1
+        self.nbuckets = max(1, max_bytes // (ENTRY_BYTES * self.bucket_size))
+        self.clear()
+
+    def clear(self):
+        self.slots = [None] * (self.nbuckets * self.bucket_size)
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        """Marks the entries stored so far as old ones, which depth-preferred slots
+        are allowed to replace."""
+        self.generation += 1
+        self.probes = 0
+        self.hits = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def get(self, key: int) -> Optional[Entry]:
+        self.probes += 1
+        index = (key % self.nbuckets) * self.bucket_size
+        entry = self.slots[index]
+        if (entry is None or entry[0] != key) and self.bucket_size == 2:
+            entry = self.slots[index + 1]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: int):
+        entry = (key, depth, bound, score, move, self.generation)
+        index = (key % self.nbuckets) * self.bucket_size
+        if self.bucket_size == 1:
+            self.slots[index] = entry
+            return
+
+        first = self.slots[index]
+        if (
+            first is None
+            or first[0] == key
+            or first[1] <= depth
+            or first[5] != self.generation
+        ):
+            self.slots[index] = entry
+        else:
+            self.slots[index + 1] = entry
+
+    def __len__(self):
+        return sum(entry is not None for entry in self.slots)
+
+
+# Layout of the 64 bits data word of a shared entry, see `SharedTranspositionTable`
+SCORE_OFFSET = 2**31
+DEPTH_SHIFT = 32
+BOUND_SHIFT = 40
+MOVE_SHIFT = 42
+GENERATION_SHIFT = 50
+USED_BIT = 1 << 63
+NO_MOVE = 0xFF
+
+
+class SharedTranspositionTable:
+    """Transposition table stored in shared memory, used by all the processes
+    of a search at once. It behaves like `TranspositionTable`.
+
+    Each entry is made of two 64 bits words: the score, bound, depth, move and
+    generation packed in a data word, and the key XOR-ed with the data word.
+    Writes are not locked: an entry torn by two processes writing it at once
+    does not give its key back when its words are XOR-ed, so it is ignored.
+
+    The process which creates the table owns it and must `unlink` it. Pickled
+    tables are attached to the same shared memory by the receiving process.
+    """
+
+    def __init__(
+        self,
+        max_bytes=64 * 2**20,
+        policy=DEPTH_PREFERRED,
+        name: Optional[str] = None,
+    ):
+        if policy not in (DEPTH_PREFERRED, ALWAYS_REPLACE):
+            raise ValueError("unknown replacement policy %r." % policy)
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.bucket_size = 2 if policy == DEPTH_PREFERRED else 1
+        # 16 bytes per entry, plus 16 bytes of header holding the generation
+        self.nbuckets = max(1, (max_bytes - 16) // (16 * self.bucket_size))
+        size = 16 * (1 + self.nbuckets * self.bucket_size)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.words = self.shm.buf.cast("Q")
+        self.probes = 0
+        self.hits = 0
+
+    def __getstate__(self):
+        return {
+            "max_bytes": self.max_bytes,
+            "policy": self.policy,
+            "name": self.shm.name,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def generation(self) -> int:
+        return self.words[0]
+
+    def clear(self):
+        np.frombuffer(self.shm.buf, dtype=np.uint64)[:] = 0
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        """Marks the entries stored so far as old ones. Only the owner of the
+        table should call it, once per search."""
+        self.words[0] = (self.words[0] + 1) & 0xFF
+        self.probes = 0
+        self.hits = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def get(self, key: int) -> Optional[Entry]:
+        self.probes += 1
+        words = self.words
+        index = 2 + 2 * (key % self.nbuckets) * self.bucket_size
+        data = words[index + 1]
+        if words[index] ^ data != key and self.bucket_size == 2:
+            index += 2
+            data = words[index + 1]
+        if data and words[index] ^ data == key:
+            self.hits += 1
+            move = data >> MOVE_SHIFT & 0xFF
+            return (
+                key,
+                data >> DEPTH_SHIFT & 0xFF,
+                data >> BOUND_SHIFT & 0x3,
+                (data & 0xFFFFFFFF) - SCORE_OFFSET,
+                None if move == NO_MOVE else move,
+                data >> GENERATION_SHIFT & 0xFF,
+            )
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: int):
+        words = self.words
+        generation = words[0]
+        data = (
+            USED_BIT
+            | generation << GENERATION_SHIFT
+            | (NO_MOVE if move is None else move) << MOVE_SHIFT
+            | bound << BOUND_SHIFT
+            | min(depth, 0xFF) << DEPTH_SHIFT
+            | score + SCORE_OFFSET
+        )
+        index = 2 + 2 * (key % self.nbuckets) * self.bucket_size
+        if self.bucket_size == 2:
+            first = words[index + 1]
+            if not (
+                not first
+                or words[index] ^ first == key
+                or first >> DEPTH_SHIFT & 0xFF <= depth
+                or first >> GENERATION_SHIFT & 0xFF != generation
+            ):
+                index += 2
+        words[index] = key ^ data
+        words[index + 1] = data
+
+    def __len__(self):
+        return int(np.count_nonzero(np.frombuffer(self.shm.buf, dtype=np.uint64)[3::2]))
+
+    def close(self):
+        self.words.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
@@ -0,0 +1,228 @@
+"""Long-lived workers running the strategy of non human players.
+
+A `MoveExecutor` keeps one worker per player for the whole game, so no thread
+or process is created per move. When a move takes too long, the executor sets
+the `CancelToken` of the player, which the strategy is expected to poll, and
+gives it `grace_secs` to stop. A process worker which ignores the token is
+killed and a new one is started for the next move. A thread worker can't be
+killed, so each thread plays with its own copy of the player: one left behind
+never shares its search state or cancel token with the thread taking over.
+"""
+import atexit
+import copy
+import multiprocessing
+import queue
+import threading
+import traceback
+import weakref
+from typing import Union
+
+from models.board import Board
+from models.player import Player
+from src.logger import logger
+
+PROCESS = "process"
+THREAD = "thread"
+
+GRACE_SECS = 0.1
+
+# executors to close at exit, not kept alive by it
+executors = weakref.WeakSet()
+
+
+class CancelToken:
+    """Flag polled by a strategy to know it must return as soon as possible."""
+
+    def __init__(self, event=None):
+        self.event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    def clear(self):
+        self.event.clear()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+
+class QueueConnection:
+    """Thread counterpart of an end of `multiprocessing.Pipe`."""
+
+    EMPTY = object()
+
+    def __init__(self, inbox: queue.Queue, outbox: queue.Queue):
+        self.inbox = inbox
+        self.outbox = outbox
+        self.pending = self.EMPTY
+
+    @classmethod
+    def pipe(cls):
+        first, second = queue.Queue(), queue.Queue()
+        return cls(first, second), cls(second, first)
+
+    def send(self, obj):
+        self.outbox.put(obj)
+
+    def poll(self, timeout: Union[float, None] = 0.0) -> bool:
+        if self.pending is self.EMPTY:
+            try:
+                self.pending = self.inbox.get(timeout=timeout)
+            except queue.Empty:
+                return False
+        return True
+
+    def recv(self):
+        self.poll(None)
+        obj, self.pending = self.pending, self.EMPTY
+        return obj
+
+
+def run_strategies(player: Player, connection, event, log_level: int):
+    """Worker loop: plays the strategy of `player` on each board received, until
+    `None` is received or the connection is closed. Each column is sent back with
+    the error raised by the strategy, if any, and the `last_search` it reported."""
+    logger.setLevel(log_level)  # spawned processes start with the default level
+    player.set_cancel_token(CancelToken(event))
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        board, token, settings = task
+        player.set_token(token)
+        player.set_settings(settings)
+        player.last_search = None
+        try:
+            result = (player.strategy(board), None, player.last_search)
+        except Exception as error:
+            result = (None, error, None)
+        try:
+            connection.send(result)
+        except Exception:
+            # the exception raised by the strategy can't be pickled
+            connection.send((None, RuntimeError(traceback.format_exc()), None))
+
+
+class MoveExecutor:
+    """Runs `player.strategy` in a worker reused from one move to the next.
+
+    Args
+    ----
+        mode: `str`, `PROCESS` or `THREAD`\n
+            A process worker plays with its own copy of the player and can be
+            killed when it ignores its cancel token. A thread worker can't be
+            killed: it is left behind to finish its move with its own copy of
+            the player and a new thread, with a new copy, takes over.
+        grace_secs: `float`\n
+            Time given to a cancelled strategy to return.
+    """
+
+    def __init__(self, player: Player, mode=PROCESS, grace_secs=GRACE_SECS):
+        if mode not in (PROCESS, THREAD):
+            raise ValueError("unknown executor mode %r." % mode)
+        self.player = player
+        self.mode = mode
+        self.grace_secs = grace_secs
+        self.worker = None
+        # `player.last_search` of the last move submitted, `None` if it timed out
+        self.last_search = None
+        executors.add(self)
+
+    def start(self):
+        if self.worker is not None and self.worker.is_alive():
+            return
+
+        name = "%s-executor" % self.player.name
+        if self.mode == PROCESS:
+            # forking the Qt app from the game thread is not safe
+            context = multiprocessing.get_context("spawn")
+            self.connection, worker_connection = context.Pipe()
+            self.cancel_token = CancelToken(context.Event())
+            # not a daemon: the strategy may start its own processes
+            self.worker = context.Process(
+                target=run_strategies,
+                args=(
+                    self.player,
+                    worker_connection,
+                    self.cancel_token.event,
+                    logger.level,
+                ),
+                name=name,
+            )
+        else:
+            self.connection, worker_connection = QueueConnection.pipe()
+            self.cancel_token = CancelToken()
+            self.worker = threading.Thread(
+                target=run_strategies,
+                args=(
+                    copy.deepcopy(self.player),
+                    worker_connection,
+                    self.cancel_token.event,
+                    logger.level,
+                ),
+                name=name,
+                daemon=True,
+            )
+        self.worker.start()
+
+    def submit(self, board: Board, timeout: Union[float, None] = None) -> int:
+        """Returns the column chosen by the player on `board`. Raises a
+        `TimeoutError` if no column was chosen within `timeout` seconds."""
+        self.start()
+        self.cancel_token.clear()
+        self.last_search = None
+        if self.mode == THREAD:
+            # a cancelled strategy may still be playing on it
+            board = board.copy()
+        self.connection.send((board, self.player.token, self.player.settings))
+
+        if self.connection.poll(timeout):
+            col, error, self.last_search = self.connection.recv()
+            if error is not None:
+                raise error
+            return col
+
+        self.cancel_token.cancel()
+        if self.connection.poll(self.grace_secs):
+            self.connection.recv()  # result of the cancelled strategy
+        else:
+            self.kill()
+        raise TimeoutError("%s took more than %ss" % (self.player.name, timeout))
+
+    def kill(self):
+        if self.mode == PROCESS:
+            logger.warning("Killing %s: it ignored its cancel token", self.worker.name)
+            self.worker.terminate()
+            self.worker.join()
+        else:
+            logger.warning(
+                "Leaving %s behind: it ignored its cancel token", self.worker.name
+            )
+            self.connection.send(None)
+        self.worker = None
+
+    def close(self):
+        if self.worker is None:
+            return
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass  # the worker is already gone
+        if self.mode == PROCESS:
+            self.worker.join(self.grace_secs)
+            if self.worker.is_alive():
+                self.worker.terminate()
+        self.worker = None
+
+
+def close_executors():
+    for executor in list(executors):
+        executor.close()
+
+
+atexit.register(close_executors)
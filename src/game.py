@@ -1,31 +1,21 @@
-import multiprocessing
+import logging
+import queue
+import threading
 import time
-from dataclasses import dataclass
+import uuid
 
 from PyQt5.QtCore import QObject
 
-import utils
+from executor import MoveExecutor
+from metrics import MetricsFile
 from models import UseState
 from models.board import Board
 from models.player import Player
+from records import GameRecordWriter, get_result
+from settings import GameSettings
 from signals import Signals
 from src.logger import logger
 
-SLEEP_SECS = 0.2
-
-
-def sleep():
-    logger.debug("sleeping for %s ms" % (SLEEP_SECS * 1_000))
-    time.sleep(SLEEP_SECS)
-
-
-@dataclass
-class GameSettings:
-    grid_nrows: int = 6
-    grid_ncols: int = 7
-    winning_length: int = 4
-    timeout_secs: float = 0.5
-
 
 class Game(QObject):
     def __init__(
@@ -40,10 +30,23 @@ class Game(QObject):
             ncols=settings.grid_ncols,
             winning_length=settings.winning_length,
         )
+        self.settings = settings
         self.timeout_secs = settings.timeout_secs
+        self.move_delay_secs = settings.move_delay_secs
+        self.metrics = None
+        if settings.metrics_path:
+            self.metrics = MetricsFile(settings.metrics_path)
+        self.records = None
+        if settings.records_path:
+            self.records = GameRecordWriter(settings.records_path)
+        # positions of the moves applied by the app, `None` for invalid moves
+        self.applied_moves = queue.Queue()
+        self.stopped = threading.Event()
         self._players, self.get_current_player = use_player()
+        for player in self._players:
+            player.set_settings(settings)
         self.signals = signals
-        self.create_get_next_move()
+        self.create_executors()
         self.reset()
 
     @property
@@ -53,24 +56,92 @@ class Game(QObject):
             return None
         return self.get_player_from_token(token_value)
 
+    @property
+    def grid_name(self) -> str:
+        board = self.board
+        return "%dx%d/%d" % (board.nrows, board.ncols, board.winning_length)
+
     @property
     def winning_cells(self):
         return self.board.winning_cells
 
     def reset(self):
         self.board.reset()
+        self.stopped.clear()
+        # tells apart the moves of each game in the metrics
+        self.game_id = uuid.uuid4().hex
+        self.moves = []
 
-    def create_get_next_move(self):
+    def create_executors(self):
         if self.timeout_secs:
             logger.info(
-                "Non human player strategy will timeout after %ss" % self.timeout_secs
+                "Non human player strategy will timeout after %ss", self.timeout_secs
             )
 
-        @utils.timeout(self.timeout_secs)
-        def get_next_move(player: Player):
-            return player.strategy(self.board)
+        # start the workers now so that the first move does not wait for them
+        self.executors = {}
+        for player in self._players:
+            if not player.is_human:
+                self.executors[player] = MoveExecutor(player)
+                self.executors[player].start()
+
+    def close_executors(self):
+        for executor in self.executors.values():
+            executor.close()
+
+    def close(self):
+        self.close_executors()
+        if self.metrics is not None:
+            self.metrics.close()
+        if self.records is not None:
+            self.records.close()
+
+    def record(self, winner: Player = None, forfeit=False, stopped=False):
+        """Appends the game to the records file, `winner` being `None` for a
+        draw."""
+        if self.records is None:
+            return
+        winner = None if winner is None else self._players.index(winner)
+        self.records.write(
+            self.settings,
+            [player.name for player in self._players],
+            self.moves,
+            get_result(winner, forfeit, stopped),
+        )
 
-        self.get_next_move = get_next_move
+    def get_next_move(self, player: Player):
+        return self.executors[player].submit(self.board, self.timeout_secs)
+
+    def report_move(self, player: Player, col, move_secs: float, timed_out=False):
+        """Emits the statistics of the move of `player` through `move_searched`,
+        logs them as a `move` event and appends them to the metrics file. The
+        search statistics are only there for the players which report a
+        `last_search`."""
+        board = self.board
+        record = {
+            "game": self.game_id,
+            "grid": self.grid_name,
+            "ply": board.nrows * board.ncols - board.capacity,
+            "player": player.name,
+            "column": col,
+            "move_secs": move_secs,
+            "timeout_secs": self.timeout_secs,
+            "timed_out": timed_out,
+        }
+        search = self.executors[player].last_search
+        if search is not None:
+            record.update(search.stats())
+        logger.info(
+            "%s played column %s in %.3fs",
+            player.name,
+            col,
+            move_secs,
+            extra={"event": "move", **record},
+        )
+        if "move_searched" in self.signals:
+            self.signals.move_searched.emit(record)
+        if self.metrics is not None:
+            self.metrics.write(record)
 
     def get_player_from_token(self, token_value: int):
         for player in self._players:
@@ -87,6 +158,12 @@ class Game(QObject):
             if player is not current_player:
                 winner = player
                 break
+        logger.info(
+            "Game over, winner: %s",
+            winner.name,
+            extra={"event": "game_over", "game": self.game_id, "winner": winner.name},
+        )
+        self.record(winner, forfeit=True)
         self.signals.game_over.emit(winner.name, self.winning_cells)
 
     def play(self, col: int):
@@ -98,30 +175,69 @@ class Game(QObject):
         pos = (col, row)
         if pos not in self.board:
             return
-        logger.debug(
-            "Board capacity = %s, winner_token = %s"
-            % (self.board.capacity, self.board.winner_token_value)
-        )
+        self.moves.append(col)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Board capacity = %s, winner_token = %s",
+                self.board.capacity,
+                self.board.winner_token_value,
+            )
         return pos
 
+    def move_applied(self, pos):
+        """Called once a move chosen through `column_choosed` is applied and the
+        current player is updated. `pos` is `None` when the move was invalid."""
+        self.applied_moves.put(pos)
+
+    def stop(self):
+        self.stopped.set()
+        self.applied_moves.put(None)
+
     def run(self):
+        logger.info(
+            "Game %s started",
+            self.game_id,
+            extra={
+                "event": "game_start",
+                "game": self.game_id,
+                "grid": self.grid_name,
+                "players": [player.name for player in self._players],
+            },
+        )
         while not self.is_over():
-            if self.get_current_player().is_human:
-                # If HUMAN, then wait for manual play
-                sleep()
-                continue
-
-            try:
-                col = self.get_next_move(self.get_current_player())
+            player = self.get_current_player()
+            if not player.is_human:
+                start = time.perf_counter()
+                try:
+                    col = self.get_next_move(player)
+                except TimeoutError:
+                    logger.error("%s took too long !", player.name)
+                    self.report_move(
+                        player, None, time.perf_counter() - start, timed_out=True
+                    )
+                    self.make_current_player_lose()
+                    self.close()
+                    return
+                self.report_move(player, col, time.perf_counter() - start)
                 self.signals.column_choosed.emit(col)
-                sleep()
-            except multiprocessing.context.TimeoutError:
-                logger.error("%s took too long !" % self.get_current_player().name)
-                self.make_current_player_lose()
+
+            # A human move is chosen by a click, both are applied by the app
+            pos = self.applied_moves.get()
+            if self.stopped.is_set():
+                self.record(stopped=True)
+                self.close()
                 return
+            if pos is not None and not player.is_human and self.move_delay_secs:
+                self.stopped.wait(self.move_delay_secs)
 
-        logger.debug("Game over")
+        self.record(self.winner)
+        self.close()
         winner = self.winner
         if winner:
             winner = winner.name
+        logger.info(
+            "Game over, winner: %s",
+            winner,
+            extra={"event": "game_over", "game": self.game_id, "winner": winner},
+        )
         self.signals.game_over.emit(winner, self.winning_cells)
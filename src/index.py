@@ -1,6 +1,6 @@
 import random as rd
 
-from PyQt5.QtCore import QThread
+from PyQt5.QtCore import QCoreApplication, QThread
 
 from models.player import Player, PlayerIterator
 from models.token import Tokens
@@ -19,6 +19,7 @@ class Connect4:
     ) -> None:
         self._players = [player1, player2]
         self.random_start = random_start
+        self.running = False
         self.init()
 
         self.signals = default_signals
@@ -56,6 +57,16 @@ class Connect4:
         if pos:
             self.ui.play(pos)
             self.current_player = next(self.players)
+        self.game.move_applied(pos)
+
+    def stop(self):
+        if self.running:
+            self.game.stop()
+            self.thread.quit()
+            self.thread.wait()
+
+    def on_game_over(self):
+        self.running = False
 
     def run(self):
         self.reset()
@@ -66,11 +77,15 @@ class Connect4:
         self.thread.started.connect(self.game.run)
         self.signals.mouse_moved.connect(self.ui.board.highlightColumn)
         self.signals.column_choosed.connect(self.play)
+        self.signals.move_searched.connect(self.ui.showMoveStats)
         self.signals.game_over.connect(self.ui.gameOver)
+        self.signals.game_over.connect(self.on_game_over)
+        QCoreApplication.instance().aboutToQuit.connect(self.stop)
 
         self.signals.game_over.connect(self.thread.quit)
         self.signals.game_over.connect(self.game.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
 
+        self.running = True
         self.thread.start()
         self.ui.show()
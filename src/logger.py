@@ -1,4 +1,24 @@
+"""Logger of the project.
+
+Records are handed to a queue by the thread logging them and formatted and
+written by the thread of a `QueueListener`, so that formatting, console and
+file writes never block the game or a search. Pass the arguments of a message
+instead of formatting it: `logger.debug("Played %d", col)` costs nothing when
+DEBUG is off. As they are formatted later on, the arguments must not change
+once logged: pass numbers and strings, not the board. On hot paths, also guard
+the call with `logger.isEnabledFor(logging.DEBUG)`.
+
+Game events are logged with an `event` extra field, e.g.
+`logger.info("Game over", extra={"event": "game_over"})`, and can be written to
+a JSONL file with `add_jsonl_sink`.
+"""
+import atexit
+import json
 import logging
+import multiprocessing.util
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE = range(8)
 
@@ -37,10 +57,47 @@ class ColoredFormatter(logging.Formatter):
             levelname_color = (
                 COLOR_SEQ % (30 + COLORS[levelname]) + levelname + RESET_SEQ
             )
+            # the record is shared with the other handlers of the listener
+            record = logging.makeLogRecord(vars(record))
             record.levelname = levelname_color
         return logging.Formatter.format(self, record)
 
 
+# attributes of every `LogRecord`, the other ones are extra fields
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a JSON object, along with its extra fields."""
+
+    def format(self, record):
+        data = {
+            "time": record.created,
+            "level": logging.getLevelName(record.levelno),
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                data[name] = value
+        return json.dumps(data, default=repr)
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queues the records as they are, leaving their formatting to the handlers
+    of the listener thread. The queue is not shared with other processes, so the
+    records don't need to be made picklable."""
+
+    def prepare(self, record):
+        return record
+
+
+class EventFilter(logging.Filter):
+    """Keeps the records of game events, which have an `event` extra field."""
+
+    def filter(self, record):
+        return hasattr(record, "event")
+
+
 class ColoredLogger(logging.Logger):
     FORMAT = "%(name)s | %(asctime)s [%(filename)s:%(lineno)d]: $BOLD%(levelname)-10s -- $RESET%(message)s"
     COLOR_FORMAT = formatter_message(FORMAT, True)
@@ -53,9 +110,63 @@ class ColoredLogger(logging.Logger):
         console = logging.StreamHandler()
         console.setFormatter(color_formatter)
 
-        self.addHandler(console)
+        # the console is written by the listener thread
+        self.listener = QueueListener(
+            queue.SimpleQueue(), console, respect_handler_level=True
+        )
+        self.queue_handler = LazyQueueHandler(self.listener.queue)
+        self.addHandler(self.queue_handler)
+        self.listener.start()
+        # writes the records still queued at exit
+        atexit.register(self.stop_listener)
+        # a forked child doesn't inherit the listener thread
+        os.register_at_fork(after_in_child=self.restart_listener)
+        # children forked by multiprocessing leave through `os._exit`, skipping
+        # atexit, and clear the finalizers of their parent once started
+        multiprocessing.util.register_after_fork(self, ColoredLogger.finalize_listener)
         return
 
+    def stop_listener(self):
+        """Writes the records still queued and stops the listener thread."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def finalize_listener(self):
+        # after the other finalizers, which may still log
+        multiprocessing.util.Finalize(self, self.stop_listener, exitpriority=-100)
+
+    def restart_listener(self):
+        self.listener = QueueListener(
+            queue.SimpleQueue(), *self.listener.handlers, respect_handler_level=True
+        )
+        self.queue_handler.queue = self.listener.queue
+        self.listener.start()
+
+    def add_listener_handler(self, handler: logging.Handler):
+        """Adds `handler` to the ones written by the listener thread."""
+        self.listener.handlers += (handler,)
+
+    def remove_listener_handler(self, handler: logging.Handler):
+        self.listener.handlers = tuple(
+            other for other in self.listener.handlers if other is not handler
+        )
+        handler.close()
+
 
 logging.setLoggerClass(ColoredLogger)
 logger = logging.getLogger("eeia:connect4")
+
+
+def add_jsonl_sink(path, level=logging.INFO) -> logging.Handler:
+    """Appends the game events of `level` and above to the JSONL file `path`, one
+    JSON object per event. Returns the handler, to give to
+    `logger.remove_listener_handler` when done."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = logging.FileHandler(path)
+    handler.setLevel(level)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(EventFilter())
+    logger.add_listener_handler(handler)
+    return handler
@@ -0,0 +1,33 @@
+"""Export of the statistics of the moves played.
+
+Records are appended to a JSONL file, one JSON object per line, so that the
+file can be read while games are still being played and files of several runs
+can simply be concatenated.
+"""
+import json
+import os
+from typing import Union
+
+
+class MetricsFile:
+    """Appends records to the JSONL file `path`, which is opened on the first
+    record and created along with its directory if needed."""
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = path
+        self.file = None
+
+    def write(self, record: dict):
+        if self.file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, "a")
+        self.file.write(json.dumps(record) + "\n")
+        # a crashed or killed game still leaves its moves behind
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -1,49 +1,217 @@
-from typing import List, Tuple, Union
+import copy
+import functools
+import logging
+import random
+from typing import Dict, List, Tuple, Union
 
-import utils
 from src.logger import logger
 
 from models.token import Tokens
 
 Position = Tuple[int, int]
 
+TOKEN_VALUES = (1, -1)
+
+
+@functools.lru_cache(maxsize=None)
+def get_zobrist_keys(size: int) -> Tuple[Dict[int, Tuple[int, ...]], int]:
+    """Returns the 64 bits Zobrist keys of each token value for the `size` bits of
+    a bitboard, along with the key of the side to play. Keys are seeded with
+    `size` so that every process builds the same keys for the same grid."""
+    rng = random.Random(size)
+    keys = {
+        token_value: tuple(rng.getrandbits(64) for _ in range(size))
+        for token_value in TOKEN_VALUES
+    }
+    return keys, rng.getrandbits(64)
+
 
 class Board:
+    """Connect4 grid stored as one bitboard per player.
+
+    The cell `(col, row)` is mapped to the bit `col * stride + row` where
+    `stride = nrows + 1`. The extra bit on top of each column is never set: it
+    separates the columns so that shifted masks never wrap around the grid.
+    """
+
     def __init__(self, nrows=6, ncols=7, winning_length=4):
         self.nrows = nrows
         self.ncols = ncols
+        if winning_length < 2:
+            raise ValueError("winning_length must be at least 2.")
         self.winning_length = winning_length
-        self.capacity = nrows * ncols
+        self.stride = nrows + 1
+        self.zobrist_keys, self.zobrist_side_key = get_zobrist_keys(ncols * self.stride)
+        self.bottom_mask = sum(1 << (col * self.stride) for col in range(ncols))
+        self.grid_mask = self.bottom_mask * ((1 << nrows) - 1)
+        # bit of the cell mirrored through the central column, for each bit
+        self.mirror_indexes = tuple(
+            (ncols - 1 - index // self.stride) * self.stride + index % self.stride
+            for index in range(ncols * self.stride)
+        )
+        # keys of each bit and of its mirrored bit, looked up once per move
+        self.zobrist_tables = {
+            token_value: (keys, tuple(keys[index] for index in self.mirror_indexes))
+            for token_value, keys in self.zobrist_keys.items()
+        }
+        self.alignment_shifts = self.get_alignment_shifts()
+        self.completion_shifts = self.get_completion_shifts()
+        self.center_order = tuple(
+            sorted(range(ncols), key=lambda col: abs(2 * col - (ncols - 1)))
+        )
         self.reset()
-        logger.debug(f"Created {self!r}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Created %s", repr(self))
 
     def reset(self):
         self.reset_winner()
-        self.board = [[0] * self.nrows for _ in range(self.ncols)]
-    
+        self.capacity = self.nrows * self.ncols
+        self.heights = [0] * self.ncols
+        self.available_columns = self.center_order
+        self.masks = {token_value: 0 for token_value in TOKEN_VALUES}
+        self.hash = 0
+        self.mirror_hash = 0  # hash of the position mirrored left-right
+
     def reset_winner(self):
         self.winner_token_value = None
-        self.winning_cells: Tuple[int, int] = []
+        self.winning_cells: List[Position] = []
+
+    def copy(self) -> "Board":
+        board = copy.copy(self)
+        board.heights = self.heights[:]
+        board.masks = dict(self.masks)
+        board.winning_cells = self.winning_cells[:]
+        return board
+
+    def get_alignment_shifts(self):
+        """For each direction, returns its step in the bitboard, the mask of the
+        `2 * winning_length - 1` cells window centered on a played token, and the
+        shifts reducing `mask & mask >> step` to the starting bits of the
+        alignments of `winning_length` tokens.
+
+        Shifted masks are combined by doubling the covered length at each step,
+        so a connect-4 needs 2 shifts per direction, a connect-5 needs 3.
+        """
+        vertical, horizontal = 1, self.stride
+        directions = (vertical, horizontal, horizontal + 1, horizontal - 1)
+        alignment_shifts = []
+        for step in directions:
+            window = 0
+            for i in range(2 * self.winning_length - 1):
+                window |= 1 << (i * step)
+            shifts = []
+            length = 2
+            while 2 * length <= self.winning_length:
+                shifts.append(length * step)
+                length *= 2
+            if length < self.winning_length:
+                shifts.append((self.winning_length - length) * step)
+            alignment_shifts.append((step, window, tuple(shifts)))
+        return tuple(alignment_shifts)
+
+    def get_completion_shifts(self):
+        """For each direction and each place of a missing token in an alignment,
+        returns the shifts bringing the other tokens of the alignment onto the
+        missing one. A vertical alignment can only miss its top token."""
+        completion_shifts = []
+        for step, _, _ in self.alignment_shifts:
+            places = range(self.winning_length)
+            if step == 1:
+                places = places[-1:]
+            for missing in places:
+                completion_shifts.append(
+                    tuple(
+                        (i - missing) * step
+                        for i in range(self.winning_length)
+                        if i != missing
+                    )
+                )
+        return tuple(completion_shifts)
+
+    @property
+    def board(self):
+        return [self.get_col(j)[0] for j in range(self.ncols)]
 
     def get_row(self, i: int):
-        # TODO
-        pass
+        positions = [(j, i) for j in range(self.ncols)]
+        values = [self[pos] for pos in positions]
+        return values, positions
 
     def get_col(self, j: int):
         positions = [(j, i) for i in range(self.nrows)]
-        return self.board[j], positions
+        values = [self[pos] for pos in positions]
+        return values, positions
 
     def get_diagonal(self, up: bool, shift: int):
-        # TODO
-        pass
+        """Returns the diagonal of cells `(j, i)` such that `j - i == shift` when
+        going `up`, and `j + i == shift` otherwise. Cells are sorted by row."""
+        if up:
+            positions = [(i + shift, i) for i in range(self.nrows)]
+        else:
+            positions = [(shift - i, i) for i in range(self.nrows)]
+        positions = [pos for pos in positions if pos in self]
+        values = [self[pos] for pos in positions]
+        return values, positions
 
     def get_height(self, col: int):
-        # TODO
-        pass
+        return self.heights[col]
 
     def get_available_columns(self):
-        # TODO
-        pass
+        """Returns the columns which are not full, center-first. The tuple is only
+        rebuilt when a column gets filled or emptied, so it is safe to iterate over
+        it while playing and cancelling moves."""
+        return self.available_columns
+
+    def update_available_columns(self):
+        self.available_columns = tuple(
+            col for col in self.center_order if self.heights[col] < self.nrows
+        )
+
+    def get_key(self, token_value: int) -> int:
+        """Returns the Zobrist hash of the position with `token_value` to play."""
+        if token_value == -1:
+            return self.hash ^ self.zobrist_side_key
+        return self.hash
+
+    def get_canonical_key(self, token_value: int) -> Tuple[int, bool]:
+        """Returns the smallest of the Zobrist hashes of the position and of its
+        mirror image, with `token_value` to play, and whether it is the one of
+        the mirror image. Columns of the mirror image map to the position through
+        `mirror_column`."""
+        mirrored = self.mirror_hash < self.hash
+        key = self.mirror_hash if mirrored else self.hash
+        if token_value == -1:
+            key ^= self.zobrist_side_key
+        return key, mirrored
+
+    def mirror_column(self, col: int) -> int:
+        return self.ncols - 1 - col
+
+    def mirror_mask(self, mask: int) -> int:
+        """Returns `mask` with its columns in reverse order."""
+        column_mask = (1 << self.stride) - 1
+        last = (self.ncols - 1) * self.stride
+        mirrored = 0
+        for shift in range(0, last + 1, self.stride):
+            mirrored |= (mask >> shift & column_mask) << (last - shift)
+        return mirrored
+
+    def get_canonical_exact_key(self, token_value: int) -> Tuple[int, bool]:
+        """Returns the smallest of the exact keys of the position and of its mirror
+        image, with `token_value` to play, and whether it is the one of the
+        mirror image."""
+        key = self.get_exact_key(token_value)
+        mirrored_key = self.mirror_mask(key)
+        if mirrored_key < key:
+            return mirrored_key, True
+        return key, False
+
+    def get_exact_key(self, token_value: int) -> int:
+        """Returns a key which identifies the position with `token_value` to play
+        without collision, in `ncols * (nrows + 1)` bits: the tokens of
+        `token_value` plus the bit of the first empty cell of each column."""
+        mask = self.masks[1] | self.masks[-1]
+        return self.masks[token_value] + mask + self.bottom_mask
 
     def is_full(self):
         return self.capacity == 0
@@ -52,60 +220,165 @@ class Board:
         return (self.winner_token_value is not None) or self.is_full()
 
     def play(self, token_value: int, col: int):
-        if col >= self.ncols or col < 0 or token_value not in {1, -1}:
-            logger.debug("Cannot play token in column %d" % col)
+        if not 0 <= col < self.ncols or token_value not in TOKEN_VALUES:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cannot play token in column %r", col)
             return -1
 
-        row = self.get_height(col)
+        heights = self.heights
+        row = heights[col]
         if row < self.nrows:
-            self.board[col][row] = token_value
+            index = col * self.stride + row
+            masks = self.masks
+            mask = masks[token_value] | 1 << index
+            masks[token_value] = mask
+            keys, mirror_keys = self.zobrist_tables[token_value]
+            self.hash ^= keys[index]
+            self.mirror_hash ^= mirror_keys[index]
+            heights[col] = row + 1
             self.capacity -= 1
-            logger.debug("Played token=%d at col=%d, row=%d" % (token_value, col, row))
-            self.check_for_winner(pos=(col, row))
+            if row + 1 == self.nrows:
+                self.update_available_columns()
+            # Whole-mask shifts are the cheapest way to rule out a win, the
+            # windowed check only runs to locate the alignment once found.
+            for step, _, shifts in self.alignment_shifts:
+                starts = mask & mask >> step
+                if starts:
+                    for shift in shifts:
+                        starts &= starts >> shift
+                    if starts:
+                        self.check_for_winner((col, row), token_value)
+                        break
             return row
         return -1
 
     def cancel_play(self, token_value: int, col: int):
-        if col >= self.ncols or col < 0 or token_value not in {1, -1}:
+        if not 0 <= col < self.ncols or token_value not in TOKEN_VALUES:
             raise ValueError("invalid arguments.")
 
-        row = self.get_height(col)
+        row = self.heights[col]
         if row == 0:
             raise Exception(
                 "cannot cancel play at column %d. Reason: column was previously empty."
                 % col
             )
-        if self.board[col][row - 1] != token_value:
+        index = col * self.stride + row - 1
+        masks = self.masks
+        mask = masks[token_value]
+        if not mask >> index & 1:
             raise Exception(
                 "cannot cancel play at column %d. Reason: expected token_value to be %d."
                 % (col, token_value)
             )
-        self.board[col][row - 1] = 0
+        masks[token_value] = mask ^ 1 << index
+        keys, mirror_keys = self.zobrist_tables[token_value]
+        self.hash ^= keys[index]
+        self.mirror_hash ^= mirror_keys[index]
+        self.heights[col] = row - 1
         self.capacity += 1
-        self.reset_winner()
+        if row == self.nrows:
+            self.update_available_columns()
+        if self.winner_token_value is not None:
+            self.reset_winner()
 
-    def check_for_winner(self, pos: Position):
-        if not pos in self:
-            logger.debug("Skipping winner check for pos=(%d, %d)" % pos)
+    def check_for_winner(self, pos: Position, token_value: int = None):
+        """Looks for an alignment through `pos` and registers its winner."""
+        col, row = pos
+        if not (0 <= row < self.nrows and 0 <= col < self.ncols):
             return
-        logger.debug("Checking for winner in sequences having pos=(%d, %d)" % pos)
-        sequences = [
-            self.get_col(pos[0]),
-            self.get_row(pos[1]),
-            self.get_diagonal(up=True, shift=pos[0] - pos[1]),
-            self.get_diagonal(up=False, shift=pos[0] + pos[1]),
-        ]
-        for values, positions in sequences:
-            start, end = utils.longest_sequence(values)
-            token_value = values[start]
-            length = end - start
-            if length >= self.winning_length:
-                self.winner_token_value = token_value
-                self.winning_cells = [positions[i] for i in range(start, end)]
-                logger.debug("Found winner !")
-                break
-        if not self.winner_token_value:
-            logger.debug("No winner found")
+        if token_value is None:
+            token_value = self[pos]
+            if not token_value:
+                return
+
+        found = self.find_alignment(self.masks[token_value], col * self.stride + row)
+        if found is not None:
+            self.set_winner(token_value, *found)
+
+    def get_winning_mask(self, token_value: int) -> int:
+        """Returns the mask of the empty cells which would complete an alignment of
+        `token_value`, whether they can be played now or not."""
+        mask = self.masks[token_value]
+        empty = self.grid_mask ^ (self.masks[1] | self.masks[-1])
+        cells = 0
+        for shifts in self.completion_shifts:
+            candidates = empty
+            for shift in shifts:
+                if shift > 0:
+                    candidates &= mask >> shift
+                else:
+                    candidates &= mask << -shift
+                if not candidates:
+                    break
+            cells |= candidates
+        return cells
+
+    def get_playable_mask(self) -> int:
+        """Returns the mask of the lowest empty cell of each column."""
+        return (self.masks[1] | self.masks[-1]) + self.bottom_mask & self.grid_mask
+
+    def get_winning_moves(self, token_value: int) -> Tuple[int, ...]:
+        """Returns the available columns, center-first, where `token_value` would
+        win by playing."""
+        wins = self.get_winning_mask(token_value) & self.get_playable_mask()
+        if not wins:
+            return ()
+        stride, heights = self.stride, self.heights
+        return tuple(
+            col
+            for col in self.available_columns
+            if wins >> (col * stride + heights[col]) & 1
+        )
+
+    def is_winning_move(self, token_value: int, col: int) -> bool:
+        """Tells whether `token_value` would win by playing in `col`, without
+        playing it."""
+        row = self.heights[col]
+        if row >= self.nrows:
+            return False
+        index = col * self.stride + row
+        mask = self.masks[token_value] | 1 << index
+        return self.find_alignment(mask, index) is not None
+
+    def find_alignment(self, mask: int, index: int):
+        """Looks for an alignment of the bits of `mask` through the bit `index`.
+        Only the `winning_length - 1` cells on each side of `index` are inspected:
+        the window is shifted down to the lowest bits so the cost does not depend
+        on the grid size.
+
+        Returns the window, the first bit of the alignment in the window, the step
+        of its direction and the offset of the window, or `None` if there is no
+        alignment.
+        """
+        reach = self.winning_length - 1
+        for step, window, shifts in self.alignment_shifts:
+            offset = index - reach * step
+            if offset >= 0:
+                line = mask >> offset & window
+            else:
+                line = mask << -offset & window
+            starts = line & line >> step
+            if starts:
+                for shift in shifts:
+                    starts &= starts >> shift
+                if starts:
+                    return line, starts, step, offset
+        return None
+
+    def set_winner(
+        self, token_value: int, line: int, starts: int, step: int, offset: int
+    ):
+        """Registers `token_value` as winner. `starts` holds the first bit of the
+        alignment found in the window `line`, whose bit 0 is the cell `offset`."""
+        i = (starts & -starts).bit_length() - 1
+        cells = []
+        while line >> i & 1:
+            cells.append(divmod(offset + i, self.stride))
+            i += step
+        self.winner_token_value = token_value
+        self.winning_cells = cells
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Found winner !")
 
     def __contains__(self, position: Position):
         j, i = position
@@ -114,9 +387,13 @@ class Board:
     def __getitem__(self, key: Union[Position, int]):
         if isinstance(key, tuple) and key in self:
             j, i = key
-            return self.board[j][i]
+            bit = 1 << (j * self.stride + i)
+            for token_value, mask in self.masks.items():
+                if mask & bit:
+                    return token_value
+            return 0
         elif isinstance(key, int) and 0 <= key < self.ncols:
-            return self.board[key]
+            return self.get_col(key)[0]
         else:
             raise KeyError(f"{key} not in {self!r}")
 
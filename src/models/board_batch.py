@@ -0,0 +1,195 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from models.board import Board
+
+# (col, row) steps of the horizontal, vertical and diagonal alignments
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+class BoardBatch:
+    """`size` boards of the same grid played in lockstep, stored as NumPy arrays.
+
+    Attributes
+    ----------
+        cells: `np.ndarray` of shape `(size, ncols, nrows)`\n
+            Token value of each cell, 0 for the empty ones.
+        heights: `np.ndarray` of shape `(size, ncols)`\n
+            Number of tokens in each column.
+        to_play: `np.ndarray` of shape `(size,)`\n
+            Token value of the player to play on each board.
+        done: `np.ndarray` of shape `(size,)`\n
+            Whether the game of each board is over.
+        winners: `np.ndarray` of shape `(size,)`\n
+            Token value of the winner of each board, 0 if there is none (yet).
+    """
+
+    def __init__(self, size: int, nrows=6, ncols=7, winning_length=4):
+        self.nrows = nrows
+        self.ncols = ncols
+        if winning_length < 2:
+            raise ValueError("winning_length must be at least 2.")
+        self.winning_length = winning_length
+        self.capacity = nrows * ncols
+
+        # The grid is padded with empty cells so that looking for alignments
+        # around a token never reads outside of it.
+        self.padding = winning_length - 1
+        pad = self.padding
+        self.grid = np.zeros((size, ncols + 2 * pad, nrows + 2 * pad), dtype=np.int8)
+        self.cells = self.grid[:, pad : pad + ncols, pad : pad + nrows]
+        self.heights = np.zeros((size, ncols), dtype=np.int16)
+        self.nmoves = np.zeros(size, dtype=np.int16)
+        self.to_play = np.ones(size, dtype=np.int8)
+        self.done = np.zeros(size, dtype=bool)
+        self.winners = np.zeros(size, dtype=np.int8)
+
+        stride = nrows + 1
+        self.bit_values = np.array(
+            [
+                [1 << (col * stride + row) for row in range(nrows)]
+                for col in range(ncols)
+            ],
+            dtype=object if ncols * stride > 64 else np.uint64,
+        )
+        self.bottom_mask = sum(1 << (col * stride) for col in range(ncols))
+
+    def __len__(self):
+        return len(self.grid)
+
+    def reset(self, indexes: Optional[np.ndarray] = None):
+        """Empties all the boards, or the boards at `indexes`."""
+        if indexes is None:
+            indexes = slice(None)
+        self.grid[indexes] = 0
+        self.heights[indexes] = 0
+        self.nmoves[indexes] = 0
+        self.to_play[indexes] = 1
+        self.done[indexes] = False
+        self.winners[indexes] = 0
+
+    def legal_moves(self) -> np.ndarray:
+        """Returns the `(size, ncols)` mask of the columns which can be played.
+        Nothing can be played on the boards whose game is over."""
+        return (self.heights < self.nrows) & ~self.done[:, np.newaxis]
+
+    def play(self, cols: Sequence[int]) -> np.ndarray:
+        """Plays the column `cols[i]` on the board `i` for its player to play, and
+        returns the rows of the played tokens. Boards whose game is over are left
+        untouched and get the row -1.
+
+        Raises a `ValueError`, without playing anything, if one of the columns
+        can't be played.
+        """
+        cols = np.asarray(cols, dtype=np.intp)
+        active = np.flatnonzero(~self.done)
+        active_cols = cols[active]
+        if np.any((active_cols < 0) | (active_cols >= self.ncols)):
+            raise ValueError("cannot play outside of the grid.")
+        rows = self.heights[active, active_cols].astype(np.intp)
+        if np.any(rows >= self.nrows):
+            raise ValueError("cannot play in a full column.")
+
+        tokens = self.to_play[active]
+        pad = self.padding
+        self.grid[active, active_cols + pad, rows + pad] = tokens
+        self.heights[active, active_cols] += 1
+        self.nmoves[active] += 1
+
+        won = self.check_wins(active, active_cols, rows, tokens)
+        self.winners[active[won]] = tokens[won]
+        self.done[active] = won | (self.nmoves[active] == self.capacity)
+        self.to_play[active] = -tokens
+
+        played_rows = np.full(len(self), -1, dtype=np.intp)
+        played_rows[active] = rows
+        return played_rows
+
+    def check_wins(
+        self,
+        indexes: np.ndarray,
+        cols: np.ndarray,
+        rows: np.ndarray,
+        tokens: np.ndarray,
+    ) -> np.ndarray:
+        """Tells, for each board of `indexes`, whether the token at `(cols, rows)`
+        is part of an alignment of `winning_length` tokens of its player."""
+        pad = self.padding
+        cols, rows = cols + pad, rows + pad
+        won = np.zeros(len(indexes), dtype=bool)
+        for dcol, drow in DIRECTIONS:
+            length = np.ones(len(indexes), dtype=np.int16)
+            for sign in (1, -1):
+                aligned = np.ones(len(indexes), dtype=bool)
+                for i in range(1, self.winning_length):
+                    cells = self.grid[
+                        indexes, cols + sign * i * dcol, rows + sign * i * drow
+                    ]
+                    aligned &= cells == tokens
+                    length += aligned
+            won |= length >= self.winning_length
+        return won
+
+    def get_exact_keys(
+        self, indexes: Optional[np.ndarray] = None, mirror=False
+    ) -> np.ndarray:
+        """Returns the `Board.get_exact_key` of each board, or of the boards at
+        `indexes`, for its player to play. With `mirror`, returns the keys of their
+        mirror images."""
+        if indexes is None:
+            indexes = slice(None)
+        bit_values = self.bit_values[::-1] if mirror else self.bit_values
+        cells = self.cells[indexes]
+        mine = cells == self.to_play[indexes, np.newaxis, np.newaxis]
+        occupied = cells != 0
+        keys = (mine * bit_values).sum(axis=(1, 2))
+        keys += (occupied * bit_values).sum(axis=(1, 2))
+        return keys + bit_values.dtype.type(self.bottom_mask)
+
+    def get_canonical_exact_keys(self, indexes: Optional[np.ndarray] = None):
+        """Returns the `Board.get_canonical_exact_key` of each board, or of the
+        boards at `indexes`, for its player to play: the keys, and whether each
+        one is the key of the mirror image of the board."""
+        keys = self.get_exact_keys(indexes)
+        mirrored_keys = self.get_exact_keys(indexes, mirror=True)
+        mirrored = mirrored_keys < keys
+        return np.where(mirrored, mirrored_keys, keys), mirrored
+
+    @classmethod
+    def from_boards(
+        cls, boards: Sequence[Board], to_play: Optional[Sequence[int]] = None
+    ) -> "BoardBatch":
+        """Stacks `boards`, which must share the same grid. `to_play` defaults to
+        the token value 1 when both players have played the same number of
+        tokens, -1 otherwise."""
+        first = boards[0]
+        batch = cls(len(boards), first.nrows, first.ncols, first.winning_length)
+        for i, board in enumerate(boards):
+            if (board.nrows, board.ncols, board.winning_length) != (
+                batch.nrows,
+                batch.ncols,
+                batch.winning_length,
+            ):
+                raise ValueError("cannot stack %r with %r." % (board, first))
+            batch.cells[i] = board.board
+        batch.heights[:] = (batch.cells != 0).sum(axis=2)
+        batch.nmoves[:] = batch.heights.sum(axis=1)
+        if to_play is None:
+            red_moves = (batch.cells == 1).sum(axis=(1, 2))
+            to_play = np.where(2 * red_moves == batch.nmoves, 1, -1)
+        batch.to_play[:] = to_play
+        batch.winners[:] = [board.winner_token_value or 0 for board in boards]
+        batch.done[:] = (batch.winners != 0) | (batch.nmoves == batch.capacity)
+        return batch
+
+    def to_board(self, index: int) -> Board:
+        """Returns the board at `index` as a `Board`."""
+        board = Board(self.nrows, self.ncols, self.winning_length)
+        for col, column in enumerate(self.cells[index].tolist()):
+            for token_value in column[: self.heights[index, col]]:
+                board.play(token_value, col)
+        return board
+
+    def to_boards(self):
+        return [self.to_board(index) for index in range(len(self))]
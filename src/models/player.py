@@ -8,6 +8,10 @@ from models.token import Token, Tokens
 class Player:
     is_human = False
     token = Tokens.EMPTY
+    settings = None  # `GameSettings` of the game being played
+    cancel_token = None  # `executor.CancelToken` set when the move is cancelled
+    # `ai.search.SearchResult` of the last move, set by the strategies which search
+    last_search = None
 
     def __init__(self, name=""):
         self.name = name
@@ -15,6 +19,12 @@ class Player:
     def set_token(self, token: Token):
         self.token = token
 
+    def set_settings(self, settings):
+        self.settings = settings
+
+    def set_cancel_token(self, cancel_token):
+        self.cancel_token = cancel_token
+
     def strategy(self, board: Board) -> int:
         """Implements the strategy for the player.
 
@@ -1,20 +1,15 @@
-from PyQt5.QtGui import QColor
-
-from utils import COLORS
-
-
 class Token:
-    def __init__(self, value: int, display: str, color: QColor) -> None:
+    def __init__(self, value: int, display: str, color: str) -> None:
         self.value = value
         self.display = display
-        self.color = color
+        self.color = color  # name of the color, resolved by the UI
 
 
 class Tokens:
     _value_to_display = {-1: "x", 0: " ", 1: "o"}
-    EMPTY = Token(value=0, display=" ", color=COLORS.WHITE)
-    RED = Token(value=1, display="o", color=COLORS.RED)
-    YELLOW = Token(value=-1, display="x", color=COLORS.YELLOW)
+    EMPTY = Token(value=0, display=" ", color="white")
+    RED = Token(value=1, display="o", color="red")
+    YELLOW = Token(value=-1, display="x", color="yellow")
 
     @classmethod
     def get_display(cls, value: int) -> str:
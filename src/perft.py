@@ -0,0 +1,200 @@
+"""Perft: counts the positions of the game tree, to check and time `Board`.
+
+The tree is walked with `Board.play` and `Board.cancel_play` down to a given
+depth. Games which end before it are not walked further. For each depth, the
+number of positions reached at that depth is counted, along with the games won
+and drawn at that depth. Any change to `Board` must leave these counts
+unchanged: the reference values of the standard 6x7 grid were computed by an
+independent implementation playing on lists.
+
+## Usage::
+
+    $ python -m perft 8
+    $ python -m perft 9 --processes 4
+    $ python -m perft 6 --rows 9 --cols 10 --length 5 --moves 4 4 5
+"""
+import argparse
+import logging
+import multiprocessing
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.board import Board
+from models.token import Tokens
+from src.logger import logger
+
+# (nodes, wins, draws) of each depth from the empty 6x7 grid, winning length 4
+REFERENCE: Dict[int, Tuple[int, int, int]] = {
+    1: (7, 0, 0),
+    2: (49, 0, 0),
+    3: (343, 0, 0),
+    4: (2401, 0, 0),
+    5: (16807, 0, 0),
+    6: (117649, 0, 0),
+    7: (823536, 13032, 0),
+    8: (5673234, 44430, 0),
+    9: (39394572, 1086882, 0),
+}
+REFERENCE_GRID = (6, 7, 4)
+# plies played before handing the sub-trees to the workers
+SPLIT_DEPTH = 2
+
+
+@dataclass
+class PerftResult:
+    nodes: int = 0
+    wins: int = 0
+    draws: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def counts(self) -> Tuple[int, int, int]:
+        return self.nodes, self.wins, self.draws
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def add(self, other: "PerftResult"):
+        self.nodes += other.nodes
+        self.wins += other.wins
+        self.draws += other.draws
+
+
+def perft(board: Board, token_value: int, depth: int, result: PerftResult):
+    """Adds to `result` the positions `depth` plies below `board`, `token_value`
+    playing first."""
+    for col in board.get_available_columns():
+        board.play(token_value, col)
+        if depth == 1:
+            result.nodes += 1
+            if board.winner_token_value is not None:
+                result.wins += 1
+            elif board.is_full():
+                result.draws += 1
+        elif not board.is_leaf():
+            perft(board, -token_value, depth - 1, result)
+        board.cancel_play(token_value, col)
+
+
+def replay(nrows: int, ncols: int, winning_length: int, moves: Sequence[int]):
+    """Returns the board after `moves` and the token value to play next."""
+    board = Board(nrows=nrows, ncols=ncols, winning_length=winning_length)
+    token_value = Tokens.RED.value
+    for col in moves:
+        if board.is_leaf() or board.play(token_value, col) == -1:
+            raise ValueError("invalid moves %r." % list(moves))
+        token_value = -token_value
+    return board, token_value
+
+
+def split(board: Board, token_value: int, depth: int, moves: List[int], tasks: list):
+    """Adds to `tasks` the move sequences of the games still going on `depth`
+    plies below `board`."""
+    for col in board.get_available_columns():
+        board.play(token_value, col)
+        moves.append(col)
+        if board.is_leaf():
+            pass  # the game has no positions below
+        elif depth == 1:
+            tasks.append(tuple(moves))
+        else:
+            split(board, -token_value, depth - 1, moves, tasks)
+        moves.pop()
+        board.cancel_play(token_value, col)
+
+
+def perft_task(grid: Tuple[int, int, int], moves: Sequence[int], depth: int):
+    """Worker task: perft of `depth` plies after `moves`."""
+    board, token_value = replay(*grid, moves)
+    result = PerftResult()
+    perft(board, token_value, depth, result)
+    return result
+
+
+def run_perft(
+    grid: Tuple[int, int, int],
+    moves: Sequence[int],
+    depth: int,
+    processes: Optional[int] = 1,
+    split_depth: int = SPLIT_DEPTH,
+) -> PerftResult:
+    """Perft of `depth` plies after `moves` on the grid `(nrows, ncols,
+    winning_length)`. With several `processes`, the sub-trees `split_depth`
+    plies below the position are walked by a pool of workers."""
+    start = time.perf_counter()
+    board, token_value = replay(*grid, moves)
+    result = PerftResult()
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or depth <= split_depth:
+        perft(board, token_value, depth, result)
+    else:
+        tasks = []
+        split(board, token_value, split_depth, list(moves), tasks)
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(
+                perft_task,
+                [(grid, task, depth - split_depth) for task in tasks],
+                chunksize=max(1, len(tasks) // (processes * 4)),
+            )
+        for other in results:
+            result.add(other)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--rows", type=int, default=REFERENCE_GRID[0])
+    parser.add_argument("--cols", type=int, default=REFERENCE_GRID[1])
+    parser.add_argument("--length", type=int, default=REFERENCE_GRID[2])
+    parser.add_argument(
+        "--moves",
+        type=int,
+        nargs="*",
+        default=[],
+        help="columns played first, 1-based as in `python -m ai.solver`",
+    )
+    parser.add_argument("-p", "--processes", type=int, default=1)
+    args = parser.parse_args(args)
+
+    logger.setLevel(logging.WARNING)
+    grid = (args.rows, args.cols, args.length)
+    moves = [col - 1 for col in args.moves]
+    try:
+        replay(args.rows, args.cols, args.length, moves)
+    except ValueError:
+        parser.error("invalid moves %s." % " ".join(map(str, args.moves)))
+    check = grid == REFERENCE_GRID and not moves
+    failed = False
+    print(
+        "%5s %12s %10s %8s %9s %12s"
+        % ("depth", "nodes", "wins", "draws", "secs", "nodes/s")
+    )
+    for depth in range(1, args.depth + 1):
+        result = run_perft(grid, moves, depth, args.processes)
+        status = ""
+        if check and depth in REFERENCE:
+            ok = result.counts == REFERENCE[depth]
+            failed |= not ok
+            status = "ok" if ok else "MISMATCH, expected %s" % (REFERENCE[depth],)
+        print(
+            "%5d %12d %10d %8d %9.3f %12.0f %s"
+            % (
+                depth,
+                result.nodes,
+                result.wins,
+                result.draws,
+                result.elapsed,
+                result.nodes_per_sec,
+                status,
+            )
+        )
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
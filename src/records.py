@@ -0,0 +1,233 @@
+"""Compact binary records of played games.
+
+A record file starts with a magic number and a version, followed by the records
+of the games, appended one after the other::
+
+    | magic, version | record_0 | record_1 | ...
+
+Each record is a header with the settings of the game, the names of the players
+(the first one started), one byte per move and a result byte::
+
+    | nrows, ncols, winning length, timeout, name lengths, number of moves |
+    | first name | second name | moves | result |
+
+A 6x7 game takes about 40 bytes. Files are memory-mapped and read one record at
+a time, so they are never loaded in memory. A record truncated by a crash ends
+the file without corrupting the records before it, and the next writer opening
+the file cuts it off before appending its own records.
+"""
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Tuple, Union
+
+from models.board import Board
+from models.token import Tokens
+from settings import GameSettings
+
+MAGIC = b"C4GR"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sB")
+# nrows, ncols, winning length, timeout (0 for none), name lengths, moves
+RECORD_HEADER = struct.Struct("<BBBfBBH")
+
+# Results: the index of the winner plus one, 0 for a draw, along with flags
+DRAW = 0
+FIRST_WINS = 1
+SECOND_WINS = 2
+# the loser played an invalid column or ran out of time
+FORFEIT = 4
+# the game was stopped before its end
+STOPPED = 8
+WINNER_MASK = 0x3
+
+
+@dataclass
+class GameRecord:
+    settings: GameSettings
+    players: Tuple[str, str]
+    moves: bytes
+    result: int
+
+    @property
+    def winner(self) -> Optional[int]:
+        """Index of the winner in `players`, `None` for a draw or a stopped
+        game."""
+        winner = self.result & WINNER_MASK
+        return winner - 1 if winner else None
+
+    @property
+    def forfeit(self) -> bool:
+        return bool(self.result & FORFEIT)
+
+    @property
+    def stopped(self) -> bool:
+        return bool(self.result & STOPPED)
+
+
+def get_result(winner: Optional[int], forfeit=False, stopped=False) -> int:
+    """Returns the result byte of a game won by the player of index `winner`."""
+    result = DRAW if winner is None else winner + 1
+    return result | (FORFEIT if forfeit else 0) | (STOPPED if stopped else 0)
+
+
+def encode_record(
+    settings: GameSettings, players: Sequence[str], moves: Sequence[int], result: int
+) -> bytes:
+    names = [name.encode()[:255] for name in players]
+    header = RECORD_HEADER.pack(
+        settings.grid_nrows,
+        settings.grid_ncols,
+        settings.winning_length,
+        settings.timeout_secs or 0.0,
+        len(names[0]),
+        len(names[1]),
+        len(moves),
+    )
+    return b"".join((header, names[0], names[1], bytes(moves), bytes((result,))))
+
+
+class GameRecordWriter:
+    """Appends records to the file `path`, which is opened on the first record
+    and created along with its directory if needed.
+
+    Each record is written with a single call and flushed, so that records of
+    concurrent games and of crashed processes never interleave."""
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+        self.file = None
+
+    def write(
+        self,
+        settings: GameSettings,
+        players: Sequence[str],
+        moves: Sequence[int],
+        result: int,
+    ):
+        if self.file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = self.path.open("ab")
+            size = self.file.tell()
+            end = get_records_end(self.path) if size else 0
+            if end < size:
+                # a record truncated by a crash would misalign the next ones
+                self.file.truncate(end)
+            if end == 0:
+                self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.file.write(encode_record(settings, players, moves, result))
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def iter_record_spans(data, path) -> Iterator[Tuple[tuple, int, int]]:
+    """Yields the header, the start of the names and the end of each complete
+    record of the file `path` mapped to `data`."""
+    if len(data) < FILE_HEADER.size:
+        return  # truncated by a crash
+    magic, version = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a valid game record file." % path)
+
+    offset, size = FILE_HEADER.size, len(data)
+    while offset + RECORD_HEADER.size <= size:
+        header = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + header[4] + header[5] + header[6] + 1
+        if end > size:
+            return  # truncated by a crash
+        yield header, start, end
+        offset = end
+
+
+def get_records_end(path: Union[str, os.PathLike]) -> int:
+    """Returns the size of the file `path` without its truncated record, if
+    any: 0 if not even the file header is complete."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return 0
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        end = FILE_HEADER.size if len(data) >= FILE_HEADER.size else 0
+        for _, _, end in iter_record_spans(data, path):
+            pass
+        return end
+    finally:
+        data.close()
+
+
+def read_records(path: Union[str, os.PathLike]) -> Iterator[GameRecord]:
+    """Yields the records of the file `path`, one at a time."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        for header, start, end in iter_record_spans(data, path):
+            nrows, ncols, length, timeout, len1, len2, nmoves = header
+            names = data[start : start + len1 + len2]
+            moves_start = start + len1 + len2
+            yield GameRecord(
+                settings=GameSettings(
+                    grid_nrows=nrows,
+                    grid_ncols=ncols,
+                    winning_length=length,
+                    timeout_secs=timeout or None,
+                ),
+                players=(names[:len1].decode(), names[len1:].decode()),
+                moves=data[moves_start : end - 1],
+                result=data[end - 1],
+            )
+    finally:
+        data.close()
+
+
+def get_board(record: GameRecord, board: Optional[Board] = None) -> Board:
+    """Returns `board` reset, or a new board if it is not of the grid of
+    `record`."""
+    settings = record.settings
+    if (
+        board is None
+        or board.nrows != settings.grid_nrows
+        or board.ncols != settings.grid_ncols
+        or board.winning_length != settings.winning_length
+    ):
+        return Board(
+            nrows=settings.grid_nrows,
+            ncols=settings.grid_ncols,
+            winning_length=settings.winning_length,
+        )
+    board.reset()
+    return board
+
+
+def iter_positions(
+    record: GameRecord, board: Optional[Board] = None
+) -> Iterator[Tuple[Board, int, int]]:
+    """Yields the board, the token value to play and the column played before
+    each move of `record`. The same board is played on from one move to the
+    next, reused from `board` when it is of the grid of the record: copy it to
+    keep a position."""
+    board = get_board(record, board)
+    token_value = Tokens.RED.value
+    for col in record.moves:
+        yield board, token_value, col
+        board.play(token_value, col)
+        token_value = -token_value
+
+
+def replay(record: GameRecord, board: Optional[Board] = None) -> Board:
+    """Returns the final board of `record`, played on `board` if it is of the
+    grid of the record."""
+    board = get_board(record, board)
+    token_value = Tokens.RED.value
+    for col in record.moves:
+        board.play(token_value, col)
+        token_value = -token_value
+    return board
@@ -0,0 +1,276 @@
+"""Headless runner playing matches between two players, without the UI.
+
+## Usage::
+
+    $ python -m runner ai.AlphaBetaPlayer models.player.RandomPlayer -n 1000
+"""
+import argparse
+import importlib
+import logging
+import multiprocessing
+import random as rd
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from executor import THREAD, MoveExecutor
+from models.board import Board
+from models.player import Player
+from models.token import Tokens
+from records import GameRecordWriter, get_result
+from settings import GameSettings
+from src.logger import logger
+
+
+@dataclass
+class GameOutcome:
+    moves: List[int]
+    winner: Optional[int]  # index of the winner in the players of `play_game`
+    forfeit: bool = False
+    elapsed: float = 0.0
+    first: int = 0  # index of the player who started, set by `play_games`
+
+
+@dataclass
+class MatchResult:
+    """Results of a match, from the point of view of the first player."""
+
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    forfeits: int = 0
+    total_moves: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def average_length(self) -> float:
+        return self.total_moves / self.games if self.games else 0.0
+
+    @property
+    def moves_per_sec(self) -> float:
+        return self.total_moves / self.elapsed if self.elapsed else 0.0
+
+    def add(self, outcome: GameOutcome):
+        if outcome.winner is None:
+            self.draws += 1
+        elif outcome.winner == 0:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.forfeits += outcome.forfeit
+        self.total_moves += len(outcome.moves)
+
+    def __str__(self):
+        return (
+            "%d games: %d wins, %d draws, %d losses (%d forfeits) | "
+            "average length %.1f moves | %.0f moves/s"
+            % (
+                self.games,
+                self.wins,
+                self.draws,
+                self.losses,
+                self.forfeits,
+                self.average_length,
+                self.moves_per_sec,
+            )
+        )
+
+
+def play_game(
+    players: Sequence[Player],
+    settings: GameSettings,
+    executors: Optional[Sequence[MoveExecutor]] = None,
+) -> GameOutcome:
+    """Plays a game on a bare `Board`, `players[0]` starts. A player returning an
+    invalid column, or taking more than `settings.timeout_secs` to play, loses
+    the game.
+
+    Args
+    ----
+        executors: `list` of `MoveExecutor`\n
+            Executors of `players`, in the same order, enforcing
+            `settings.timeout_secs`. Without them, the strategies are called
+            directly and never time out.
+    """
+    start = time.perf_counter()
+    board = Board(
+        nrows=settings.grid_nrows,
+        ncols=settings.grid_ncols,
+        winning_length=settings.winning_length,
+    )
+    for player, token in zip(players, (Tokens.RED, Tokens.YELLOW)):
+        player.set_token(token)
+        player.set_settings(settings)
+
+    moves = []
+    turn = 0
+    while not board.is_leaf():
+        player = players[turn]
+        try:
+            if executors is None:
+                col = player.strategy(board)
+            else:
+                col = executors[turn].submit(board, settings.timeout_secs)
+        except TimeoutError:
+            logger.error("%s ran out of time", player.name)
+            return GameOutcome(moves, 1 - turn, True, time.perf_counter() - start)
+        if col is None or board.play(player.token.value, col) == -1:
+            logger.error("%s played an invalid column %r", player.name, col)
+            return GameOutcome(moves, 1 - turn, True, time.perf_counter() - start)
+        moves.append(col)
+        turn = 1 - turn
+
+    winner = None
+    if board.winner_token_value is not None:
+        winner = 0 if board.winner_token_value == Tokens.RED.value else 1
+    return GameOutcome(moves, winner, False, time.perf_counter() - start)
+
+
+def play_games(player1: Player, player2: Player, settings, games, seed, swap):
+    """Worker task: plays the games of indexes `games`. When `swap` is set, the
+    second player starts the odd games."""
+    executors = None
+    if settings.timeout_secs:
+        # threads share the seeded `random` and can run in daemon pool workers
+        executors = [MoveExecutor(player, THREAD) for player in (player1, player2)]
+    outcomes = []
+    try:
+        for game in games:
+            if seed is not None:
+                rd.seed(seed + game)
+            first = 1 if swap and game % 2 else 0
+            order = (first, 1 - first)
+            players = [(player1, player2)[i] for i in order]
+            if executors is not None:
+                outcome = play_game(players, settings, [executors[i] for i in order])
+            else:
+                outcome = play_game(players, settings)
+            outcome.first = first
+            if outcome.winner is not None and first == 1:
+                outcome.winner = 1 - outcome.winner  # index in (player1, player2)
+            outcomes.append(outcome)
+    finally:
+        for executor in executors or ():
+            executor.close()
+    return outcomes
+
+
+def run_match(
+    player1: Player,
+    player2: Player,
+    ngames: int,
+    settings=GameSettings(),
+    processes: Optional[int] = None,
+    seed: Optional[int] = None,
+    swap=True,
+    records_path: Optional[str] = None,
+) -> MatchResult:
+    """Plays `ngames` games between `player1` and `player2` over a pool of
+    `processes` workers (defaults to the number of CPUs). Each worker plays with
+    its own copy of the players.
+
+    Args
+    ----
+        seed: `int`\n
+            Seeds `random` before each game, making a match reproducible.
+        swap: `bool`\n
+            Alternate the starting player between games.
+        records_path: `str`\n
+            File the games are appended to, see `records`.
+    """
+    for player in (player1, player2):
+        if player.is_human:
+            raise ValueError("%s is a human player." % player.name)
+
+    processes = processes or multiprocessing.cpu_count()
+    chunk = max(1, ngames // (processes * 4))
+    tasks = [
+        (player1, player2, settings, range(i, min(i + chunk, ngames)), seed, swap)
+        for i in range(0, ngames, chunk)
+    ]
+
+    result = MatchResult()
+    start = time.perf_counter()
+    if processes == 1:
+        batches = [play_games(*task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            batches = pool.starmap(play_games, tasks)
+    records = GameRecordWriter(records_path) if records_path else None
+    names = (player1.name, player2.name)
+    for outcomes in batches:
+        for outcome in outcomes:
+            result.add(outcome)
+            if records is not None:
+                write_record(records, outcome, names, settings)
+    result.elapsed = time.perf_counter() - start
+    if records is not None:
+        records.close()
+    return result
+
+
+def write_record(
+    records: GameRecordWriter,
+    outcome: GameOutcome,
+    names: Sequence[str],
+    settings: GameSettings,
+):
+    """Appends `outcome` to `records`, the players in the order they played."""
+    winner = outcome.winner
+    if outcome.first == 1:
+        names = names[::-1]
+        winner = None if winner is None else 1 - winner
+    records.write(settings, names, outcome.moves, get_result(winner, outcome.forfeit))
+
+
+def load_player(path: str) -> Player:
+    """Creates a player from the dotted path of its class, ex:
+    `ai.AlphaBetaPlayer`."""
+    module_name, _, class_name = path.rpartition(".")
+    player_class = getattr(importlib.import_module(module_name), class_name)
+    return player_class(name=class_name)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("player1", help="dotted path of a Player class")
+    parser.add_argument("player2", help="dotted path of a Player class")
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("-p", "--processes", type=int, default=None)
+    parser.add_argument("--rows", type=int, default=GameSettings.grid_nrows)
+    parser.add_argument("--cols", type=int, default=GameSettings.grid_ncols)
+    parser.add_argument("--length", type=int, default=GameSettings.winning_length)
+    parser.add_argument("--timeout", type=float, default=GameSettings.timeout_secs)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-swap", action="store_true")
+    parser.add_argument("--records", help="file the games are appended to")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args(args)
+
+    logger.setLevel(logging.DEBUG if args.debug else logging.WARNING)
+    settings = GameSettings(
+        grid_nrows=args.rows,
+        grid_ncols=args.cols,
+        winning_length=args.length,
+        timeout_secs=args.timeout,
+    )
+    player1, player2 = load_player(args.player1), load_player(args.player2)
+    result = run_match(
+        player1,
+        player2,
+        args.games,
+        settings=settings,
+        processes=args.processes,
+        seed=args.seed,
+        swap=not args.no_swap,
+        records_path=args.records,
+    )
+    print("%s vs %s: %s" % (player1.name, player2.name, result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class GameSettings:
+    grid_nrows: int = 6
+    grid_ncols: int = 7
+    winning_length: int = 4
+    timeout_secs: float = 0.5
+    # number of processes searching the moves of AI players which support it
+    search_workers: int = 1
+    # UI: pause after each non human move, to let its animation play
+    move_delay_secs: float = 0.0
+    # JSONL file the statistics of the non human moves are appended to
+    metrics_path: Optional[str] = None
+    # file the games are recorded to, see `records`
+    records_path: Optional[str] = None
+    # UI: show the statistics of the last non human move
+    show_search_stats: bool = False
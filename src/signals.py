@@ -36,6 +36,11 @@ class RestartGame(Signal):
     trigger = pyqtSignal(name=name)
 
 
+class MoveSearched(Signal):
+    name = "move_searched"
+    trigger = pyqtSignal(dict, name=name)
+
+
 class Signals:
     def __init__(self, *signals) -> None:
         self._signals: dict[str, Signal] = {}
@@ -57,4 +62,6 @@ class Signals:
         return name in self._signals
 
 
-default_signals = Signals(MouseMoved(), ColumnChoosed(), GameOver(), RestartGame())
+default_signals = Signals(
+    MouseMoved(), ColumnChoosed(), GameOver(), RestartGame(), MoveSearched()
+)
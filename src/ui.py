@@ -1,24 +1,54 @@
-from copy import deepcopy
+import math
 from typing import Dict, List, Tuple, Union
 
-from PyQt5.QtCore import QEasingCurve, QPoint, QPropertyAnimation, Qt
-from PyQt5.QtGui import QBrush, QColor, QFont, QMouseEvent, QPainter, QPaintEvent, QPen
-from PyQt5.QtWidgets import (
-    QFrame,
-    QGraphicsDropShadowEffect,
-    QGridLayout,
-    QLabel,
-    QWidget,
+from PyQt5.QtCore import (
+    QAbstractAnimation,
+    QEasingCurve,
+    QPoint,
+    QPointF,
+    QPropertyAnimation,
+    QRect,
+    QRectF,
+    QSizeF,
+    Qt,
 )
+from PyQt5.QtGui import (
+    QBrush,
+    QColor,
+    QFont,
+    QMouseEvent,
+    QPainter,
+    QPaintEvent,
+    QPen,
+    QPixmap,
+    QRadialGradient,
+    QResizeEvent,
+)
+from PyQt5.QtWidgets import QFrame, QGridLayout, QLabel, QWidget
 
 from game import GameSettings
 from models import UseState
+from models.token import Token
 from signals import Signals
-from utils import COLORS, Point
+from utils import Point
 
 Position = Tuple[int, int]
 
 
+class COLORS:
+    YELLOW = QColor(234, 207, 71)
+    BLUE = QColor(41, 63, 132)
+    RED = QColor(199, 43, 38)
+    WHITE = QColor(Qt.white)
+    BLACK = QColor(Qt.black)
+    GREEN = QColor(0, 255, 0)
+
+    @classmethod
+    def of(cls, token: Token) -> QColor:
+        """Returns a copy of the color of `token`."""
+        return QColor(getattr(cls, token.color.upper()))
+
+
 class Connect4UI(QWidget):
     title = "Connect 4 game"
     w_width = 800  # window width
@@ -36,6 +66,7 @@ class Connect4UI(QWidget):
         self.signals = signals
         self.nrows = settings.grid_nrows
         self.ncols = settings.grid_ncols
+        self.show_search_stats = settings.show_search_stats
 
         self.board = Connect4Board(self)
 
@@ -61,10 +92,10 @@ class Connect4UI(QWidget):
 
         self.layout = QGridLayout()
         self.player_1 = Connect4Player(
-            self, name=players[0].name, color=players[0].token.color
+            self, name=players[0].name, color=COLORS.of(players[0].token)
         )
         self.player_2 = Connect4Player(
-            self, name=players[1].name, color=players[1].token.color
+            self, name=players[1].name, color=COLORS.of(players[1].token)
         )
 
         self.layout.addWidget(self.gameOverLabel, 0, 0, 1, 4)
@@ -72,14 +103,41 @@ class Connect4UI(QWidget):
         self.layout.addWidget(self.player_2, 4, 0, 1, 2)
         self.layout.addWidget(self.board, 1, 1, 6, 3)
 
+        self.statsLabel = QLabel()
+        self.statsLabel.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.statsLabel.setVisible(self.show_search_stats)
+        self.layout.addWidget(self.statsLabel, 5, 0, 1, 1)
+
         self.setLayout(self.layout)
 
     def play(self, pos: Position):
         _, get_current_player = self.use_player()
-        color = get_current_player().token.color
+        color = COLORS.of(get_current_player().token)
         ui_pos = (pos[0], self.nrows - 1 - pos[1])
         # self.board.addToken(ui_pos, color)
         self.board.dropToken(ui_pos, color)
+        # painted once the next player is the current one
+        self.board.refreshHighlight()
+
+    def showMoveStats(self, record: dict):
+        """Shows the statistics of the last non human move, see
+        `Game.report_move`."""
+        if not self.show_search_stats:
+            return
+        lines = ["<b>%s</b>" % record["player"]]
+        if record["timed_out"]:
+            lines.append("timed out")
+        else:
+            lines.append("%.3fs" % record["move_secs"])
+        if "depth" in record:
+            lines += [
+                "depth %d" % record["depth"],
+                "%d nodes" % record["nodes"],
+                "%d nodes/s" % record["nodes_per_sec"],
+                "TT hits %.0f%%" % (100 * record["tt_hit_rate"]),
+                "branching %.2f" % record["branching_factor"],
+            ]
+        self.statsLabel.setText("<br>".join(lines))
 
     def gameOver(self, winner: Union[str, None], winning_cells: List[Position]):
         self.game_over = True
@@ -114,6 +172,81 @@ class Connect4Player(QWidget):
         painter.drawEllipse(margin_left, margin_top, disc_size, disc_size)
 
 
+class Connect4Token(QWidget):
+    """A dropped token, painted along with its border and its drop shadow.
+
+    The widget is larger than the token by `padding` on each side, so that its
+    shadow and the token highlighted at `max_scale` fit in it. Tokens are pooled
+    by the board and reused across games with `setToken`."""
+
+    shadow_width = 5
+    border_width = 2
+    max_scale = 1.1  # of a highlighted token
+    shadow_offset = QPointF(1, 1.5)
+    # shadow of each token width, shared by all the tokens
+    shadows: Dict[Tuple[int, float], QPixmap] = {}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.token_width = 0
+        self.padding = self.shadow_width
+        self.color = COLORS.WHITE
+        self.border_color = COLORS.WHITE
+        self.scale = 1.0
+
+    def setToken(self, width: int, color: QColor):
+        self.token_width = width
+        self.color = color
+        self.border_color = COLORS.WHITE
+        self.scale = 1.0
+        # plus one pixel of antialiasing around the scaled up token
+        scale_margin = math.ceil(width * (self.max_scale - 1) / 2) + 1
+        self.padding = max(self.shadow_width, scale_margin)
+        self.resize(width + 2 * self.padding, width + 2 * self.padding)
+        self.update()
+
+    def highlight(self, color: QColor, scale=max_scale):
+        self.border_color = color
+        self.scale = min(scale, self.max_scale)
+        self.update()
+
+    def paintEvent(self, event: QPaintEvent):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.drawPixmap(0, 0, self.getShadow())
+
+        width = self.token_width * self.scale - self.border_width
+        center = QRectF(self.rect()).center()
+        painter.setPen(QPen(self.border_color, self.border_width, Qt.SolidLine))
+        painter.setBrush(QBrush(self.color, Qt.SolidPattern))
+        painter.drawEllipse(center, width / 2, width / 2)
+
+    def getShadow(self) -> QPixmap:
+        ratio = self.devicePixelRatioF()
+        key = (self.token_width, ratio)
+        if key not in self.shadows:
+            pixmap = QPixmap(self.size() * ratio)
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+
+            # a white halo fading out of the token, as a blurred shadow would
+            radius = self.token_width / 2 + self.shadow_width
+            inner = self.token_width / 2 / radius
+            center = QRectF(self.rect()).center() + self.shadow_offset
+            gradient = QRadialGradient(center, radius)
+            gradient.setColorAt(inner, QColor(255, 255, 255, 200))
+            gradient.setColorAt(1, QColor(255, 255, 255, 0))
+
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(gradient))
+            painter.drawEllipse(center, radius, radius)
+            painter.end()
+            self.shadows[key] = pixmap
+        return self.shadows[key]
+
+
 class Connect4Board(QFrame):
     f_width = 550  # frame width
     f_height = 500  # frame height
@@ -137,7 +270,14 @@ class Connect4Board(QFrame):
 
         self.game_over = False
         self.h_col = None  # highlighted col
-        self.h_color = None  # highlighted col color
+        self.hovered_col = None  # col under the mouse
+        # grid and empty cells, rendered once and reused by every paint
+        self.grid_pixmap: Union[QPixmap, None] = None
+        # Token widgets are only created when dropped, and kept in a pool for
+        # the next games. Animations are reused once stopped.
+        self.cells: Dict[Position, Connect4Token] = {}
+        self.token_pool: List[Connect4Token] = []
+        self.anims: List[QPropertyAnimation] = []
 
         self.reset()
 
@@ -154,33 +294,47 @@ class Connect4Board(QFrame):
         for i in range(self.ncols):
             for j in range(self.nrows):
                 self.tokens[(i, j)] = Qt.white
+        self.grid_pixmap = None
 
     def resetDropTokens(self):
-        self.cells: Dict[Position, QWidget] = {}
-        self.anims: Dict[Position, QPropertyAnimation] = {}
-        radius = self.cell_size
-        width = radius - 2 * self.cell_margin
-        width2 = width * 1.1
-        shift = self.margin + self.cell_margin
-        for i in range(self.ncols):
-            for j in range(self.nrows):
-                x = i * radius + shift
-                y = j * radius + shift
-                cell = QWidget(self)
-                cell.resize(width, width)
-                cell.move(x, 0)
-                self.cells[(i, j)] = cell
-                # bounce anim
-                anim = QPropertyAnimation(cell, b"pos")
-                anim.setEasingCurve(QEasingCurve.OutBounce)
-                anim.setEndValue(QPoint(x, y))
-                anim.setDuration((j + 1) * 50)
-                self.anims[(i, j)] = anim
+        for anim in self.anims:
+            anim.stop()
+        for token in self.cells.values():
+            token.hide()
+            self.token_pool.append(token)
+        self.cells = {}
+
+    def resizeEvent(self, event: QResizeEvent):
+        self.grid_pixmap = None
+        super().resizeEvent(event)
 
     def paintEvent(self, event: QPaintEvent):
         painter = QPainter(self)
-        painter.setPen(QPen(Qt.black, -1, Qt.SolidLine))
-        self.drawGrid(painter)
+        # only the damaged part of the cached grid is copied, the source
+        # rectangle being in the device pixels of the pixmap
+        rect = QRectF(event.rect())
+        pixmap = self.getGridPixmap()
+        ratio = pixmap.devicePixelRatioF()
+        source = QRectF(rect.topLeft() * ratio, QSizeF(rect.size()) * ratio)
+        painter.drawPixmap(rect, pixmap, source)
+
+        if self.h_col is not None and self.h_col < self.ncols:
+            painter.setPen(QPen(Qt.black, -1, Qt.SolidLine))
+            painter.setBrush(QBrush(self.highlightColor(), Qt.Dense4Pattern))
+            painter.drawRect(self.columnRect(self.h_col))
+
+    def getGridPixmap(self) -> QPixmap:
+        if self.grid_pixmap is None:
+            ratio = self.devicePixelRatioF()
+            pixmap = QPixmap(self.size() * ratio)
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setPen(QPen(Qt.black, -1, Qt.SolidLine))
+            self.drawGrid(painter)
+            painter.end()
+            self.grid_pixmap = pixmap
+        return self.grid_pixmap
 
     def drawGrid(self, painter: QPainter):
         # set grid background
@@ -195,14 +349,14 @@ class Connect4Board(QFrame):
             for j in range(self.nrows):
                 self.drawToken(painter, (i, j), self.tokens[(i, j)])
 
-        if self.h_col is not None and self.h_col < self.ncols:
-            painter.setBrush(QBrush(self.h_color, Qt.Dense4Pattern))
-            painter.drawRect(
-                self.margin + self.h_col * self.cell_size,
-                self.margin,
-                self.cell_size,
-                grid_height,
-            )
+    def columnRect(self, col: int) -> QRect:
+        """Returns the rectangle of `col`, along with its outline."""
+        return QRect(
+            self.margin + col * self.cell_size,
+            self.margin,
+            self.cell_size,
+            self.nrows * self.cell_size,
+        )
 
     def drawGridLines(self, painter: QPainter):
         thickness = 3
@@ -244,19 +398,33 @@ class Connect4Board(QFrame):
 
     def dropToken(self, pos: Position, color: QColor):
         # print("Will drop token at position", pos, "and color:", color.name())
-        cell = self.cells[pos]
-        width = self.cell_size - 2 * self.cell_margin
-        cell.setStyleSheet(
-            "background-color:%s;border-radius:%spx;border:2px solid white;"
-            % (color.name(), width / 2)
-        )
-
-        effect = QGraphicsDropShadowEffect()
-        effect.setColor(Qt.white)
-        effect.setOffset(1, 1.5)
-        effect.setBlurRadius(10)
-        cell.setGraphicsEffect(effect)
-        self.anims[pos].start()
+        token = self.token_pool.pop() if self.token_pool else Connect4Token(self)
+        token.setToken(self.cell_size - 2 * self.cell_margin, color)
+        self.cells[pos] = token
+
+        shift = self.margin + self.cell_margin - token.padding
+        x = pos[0] * self.cell_size + shift
+        y = pos[1] * self.cell_size + shift
+        token.move(x, 0)
+        token.show()
+
+        # bounce anim
+        anim = self.getAnimation()
+        anim.setTargetObject(token)
+        anim.setStartValue(QPoint(x, 0))
+        anim.setEndValue(QPoint(x, y))
+        anim.setDuration((pos[1] + 1) * 50)
+        anim.start()
+
+    def getAnimation(self) -> QPropertyAnimation:
+        for anim in self.anims:
+            if anim.state() == QAbstractAnimation.Stopped:
+                return anim
+        anim = QPropertyAnimation(self)
+        anim.setPropertyName(b"pos")
+        anim.setEasingCurve(QEasingCurve.OutBounce)
+        self.anims.append(anim)
+        return anim
 
     def mousePressEvent(self, event: QMouseEvent):
         if self.game_over:
@@ -276,15 +444,31 @@ class Connect4Board(QFrame):
         if x < self.margin or x > self.f_width - self.margin:
             return
         col = (x - self.margin) // self.cell_size
-        self.signals.mouse_moved.emit(col)
+        if col != self.hovered_col:
+            self.hovered_col = col
+            self.signals.mouse_moved.emit(col)
 
     def highlightColumn(self, col: int):
-        color = self.get_current_player().token.color
-        color = deepcopy(color)
-        color.setAlpha(150)
+        if col == self.h_col:
+            return
+        if self.h_col is not None:
+            self.updateColumn(self.h_col)
         self.h_col = col
-        self.h_color = color
-        self.update()
+        self.updateColumn(col)
+
+    def refreshHighlight(self):
+        """Repaints the highlighted column, in the color of the current player."""
+        if self.h_col is not None:
+            self.updateColumn(self.h_col)
+
+    def updateColumn(self, col: int):
+        # the outline of the rectangle overflows it by a pixel
+        self.update(self.columnRect(col).adjusted(-1, -1, 1, 1))
+
+    def highlightColor(self) -> QColor:
+        color = COLORS.of(self.get_current_player().token)
+        color.setAlpha(150)
+        return color
 
     # def addToken(self, pos: tuple, color: QColor):
     #     self.tokens[pos] = color
@@ -296,12 +480,4 @@ class Connect4Board(QFrame):
     def highlightWinningCells(self, winning_cells: List[Position]):
         winning_ui_cells = [(pos[0], self.nrows - 1 - pos[1]) for pos in winning_cells]
         for pos in winning_ui_cells:
-            cell = self.cells[pos]
-            width = (self.cell_size - 2 * self.cell_margin) * 1.1
-            width = int(width)
-            cell.resize(width, width)
-            style = cell.styleSheet()
-            cell.setStyleSheet(
-                style
-                + "border-radius:%spx;border:2px solid rgb(0, 255, 0);" % (width / 2)
-            )
+            self.cells[pos].highlight(COLORS.GREEN)
@@ -1,19 +1,6 @@
 from __future__ import annotations
 
-import functools
-from multiprocessing.pool import ThreadPool
-from typing import Callable, List, Tuple, Union
-
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor
-
-
-class COLORS:
-    YELLOW = QColor(234, 207, 71)
-    BLUE = QColor(41, 63, 132)
-    RED = QColor(199, 43, 38)
-    WHITE = Qt.white
-    BLACK = Qt.black
+from typing import List, Tuple, Union
 
 
 def longest_sequence(array: List[int]) -> Tuple[int, int]:
@@ -31,33 +18,6 @@ def longest_sequence(array: List[int]) -> Tuple[int, int]:
     return best
 
 
-def timeout(seconds: Union[int, None]):
-    """Timeout decorator. Given a work / task to perform, this decorator will raise
-    a `TimeoutError` if the task takes too long.
-
-    ## Usage::
-
-        import time
-
-        @timeout(2.0)
-        def work():
-            print('work started')
-            time.sleep(3)
-            print('work finished')
-    """
-
-    def timeout_decorator(work: Callable):
-        @functools.wraps(work)
-        def wrapper(*args, **kwargs):
-            pool = ThreadPool(processes=1)
-            async_result = pool.apply_async(work, args, kwargs)
-            return async_result.get(seconds)
-
-        return wrapper
-
-    return timeout_decorator
-
-
 class Point:
     def __init__(self, x: int, y: int) -> None:
         self.x = x
@@ -0,0 +1,152 @@
+import random
+import unittest
+
+from models.board import Board
+
+GRIDS = [(6, 7, 4), (6, 7, 3), (9, 10, 5), (20, 20, 5), (4, 4, 4)]
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+
+def has_alignment(board: Board, token_value: int) -> bool:
+    """Reference win check, cell by cell."""
+    for col in range(board.ncols):
+        for row in range(board.nrows):
+            for dcol, drow in DIRECTIONS:
+                cells = [
+                    (col + k * dcol, row + k * drow)
+                    for k in range(board.winning_length)
+                ]
+                if all(cell in board and board[cell] == token_value for cell in cells):
+                    return True
+    return False
+
+
+def play_random_game(board: Board, rng: random.Random):
+    """Plays random moves until the game is over, returns them."""
+    moves, token_value = [], 1
+    while not board.is_leaf():
+        col = rng.choice(board.get_available_columns())
+        board.play(token_value, col)
+        moves.append((token_value, col))
+        token_value = -token_value
+    return moves
+
+
+class BoardTest(unittest.TestCase):
+    def assert_win(self, board: Board, moves, token_value, cells):
+        for value, col in moves:
+            self.assertIsNone(board.winner_token_value)
+            board.play(value, col)
+        self.assertEqual(board.winner_token_value, token_value)
+        self.assertEqual(sorted(board.winning_cells), sorted(cells))
+
+    def test_vertical_win(self):
+        board = Board()
+        moves = [(1, 2), (-1, 3)] * 3 + [(1, 2)]
+        self.assert_win(board, moves, 1, [(2, row) for row in range(4)])
+
+    def test_horizontal_win(self):
+        board = Board(winning_length=5)
+        moves = [(-1, col) for col in range(1, 6)]
+        self.assert_win(board, moves, -1, [(col, 0) for col in range(1, 6)])
+
+    def test_diagonal_wins(self):
+        for up in (True, False):
+            board = Board(nrows=20, ncols=20, winning_length=5)
+            moves = []
+            for k in range(5):
+                col = 10 + k if up else 10 - k
+                moves += [(-1, col)] * k + [(1, col)]
+            cells = [(10 + k if up else 10 - k, k) for k in range(5)]
+            self.assert_win(board, moves, 1, cells)
+
+    def test_no_win_across_columns(self):
+        board = Board()
+        for _ in range(3):
+            board.play(-1, 0)
+        for _ in range(3):
+            board.play(1, 0)
+        board.play(1, 1)
+        self.assertIsNone(board.winner_token_value)
+
+    def test_winner_matches_reference(self):
+        rng = random.Random(0)
+        for nrows, ncols, length in GRIDS:
+            for _ in range(20):
+                board = Board(nrows, ncols, length)
+                moves = play_random_game(board, rng)
+                winner = board.winner_token_value
+                if winner is None:
+                    self.assertFalse(has_alignment(board, 1))
+                    self.assertFalse(has_alignment(board, -1))
+                else:
+                    self.assertEqual(winner, moves[-1][0])
+                    self.assertTrue(has_alignment(board, winner))
+                    self.assertGreaterEqual(len(board.winning_cells), length)
+                    self.assertTrue(
+                        all(board[cell] == winner for cell in board.winning_cells)
+                    )
+                    board.cancel_play(*moves[-1])
+                    self.assertFalse(has_alignment(board, winner))
+
+    def test_cancel_play_round_trip(self):
+        rng = random.Random(1)
+        for nrows, ncols, length in GRIDS:
+            board = Board(nrows, ncols, length)
+            moves = play_random_game(board, rng)
+            for token_value, col in reversed(moves):
+                board.cancel_play(token_value, col)
+            empty = Board(nrows, ncols, length)
+            self.assertEqual(board.masks, empty.masks)
+            self.assertEqual(board.heights, empty.heights)
+            self.assertEqual(board.capacity, empty.capacity)
+            self.assertEqual(board.hash, 0)
+            self.assertEqual(board.mirror_hash, 0)
+            self.assertIsNone(board.winner_token_value)
+            self.assertEqual(board.winning_cells, [])
+            self.assertEqual(
+                board.get_available_columns(), empty.get_available_columns()
+            )
+
+    def test_keys_of_transpositions_and_mirrors(self):
+        moves = [(1, 0), (-1, 3), (1, 1), (-1, 5)]
+        transposed = [(1, 1), (-1, 5), (1, 0), (-1, 3)]
+        mirrored = [(value, 6 - col) for value, col in moves]
+        boards = []
+        for sequence in (moves, transposed, mirrored):
+            board = Board()
+            for value, col in sequence:
+                board.play(value, col)
+            boards.append(board)
+        board, other, mirror = boards
+
+        self.assertEqual(board.get_key(1), other.get_key(1))
+        self.assertNotEqual(board.get_key(1), board.get_key(-1))
+        self.assertEqual(board.mirror_hash, mirror.hash)
+        self.assertEqual(board.get_exact_key(1), other.get_exact_key(1))
+        self.assertEqual(
+            board.mirror_mask(board.get_exact_key(1)), mirror.get_exact_key(1)
+        )
+        for get_key in ("get_canonical_key", "get_canonical_exact_key"):
+            key, is_mirrored = getattr(board, get_key)(1)
+            mirror_key, mirror_is_mirrored = getattr(mirror, get_key)(1)
+            self.assertEqual(key, mirror_key)
+            self.assertNotEqual(is_mirrored, mirror_is_mirrored)
+
+    def test_getitem_returns_copies(self):
+        board = Board()
+        board.play(1, 3)
+        column = board[3]
+        self.assertEqual(column, [1, 0, 0, 0, 0, 0])
+        column[1] = -1
+        self.assertEqual(board[3], [1, 0, 0, 0, 0, 0])
+        self.assertEqual(board[(3, 1)], 0)
+        grid = board.board
+        grid[3][0] = -1
+        self.assertEqual(board[(3, 0)], 1)
+        with self.assertRaises(KeyError):
+            board[(7, 0)]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import random
+import unittest
+
+import numpy as np
+
+from models.board import Board
+from models.board_batch import BoardBatch
+
+GRIDS = [(6, 7, 4), (6, 7, 3), (9, 10, 5)]
+
+
+class BoardBatchTest(unittest.TestCase):
+    def test_same_winners_as_board(self):
+        rng = random.Random(0)
+        for nrows, ncols, length in GRIDS:
+            size = 64
+            batch = BoardBatch(size, nrows, ncols, length)
+            boards = [Board(nrows, ncols, length) for _ in range(size)]
+            token_value = 1
+            while not batch.done.all():
+                cols = [
+                    rng.choice(board.get_available_columns())
+                    if not board.is_leaf()
+                    else 0
+                    for board in boards
+                ]
+                rows = batch.play(cols)
+                for i, board in enumerate(boards):
+                    if board.is_leaf():
+                        self.assertEqual(rows[i], -1)
+                    else:
+                        self.assertEqual(board.play(token_value, cols[i]), rows[i])
+                token_value = -token_value
+
+                self.assertEqual(batch.done.tolist(), [b.is_leaf() for b in boards])
+                winners = [b.winner_token_value or 0 for b in boards]
+                self.assertEqual(batch.winners.tolist(), winners)
+
+    def test_keys_match_board(self):
+        rng = random.Random(1)
+        batch = BoardBatch(16)
+        boards = [Board() for _ in range(16)]
+        token_value = 1
+        for _ in range(6):
+            cols = [rng.choice(board.get_available_columns()) for board in boards]
+            batch.play(cols)
+            for board, col in zip(boards, cols):
+                board.play(token_value, col)
+            token_value = -token_value
+        keys, mirrored = batch.get_canonical_exact_keys()
+        expected = [board.get_canonical_exact_key(token_value) for board in boards]
+        self.assertEqual(keys.tolist(), [key for key, _ in expected])
+        self.assertEqual(mirrored.tolist(), [flag for _, flag in expected])
+
+    def test_invalid_columns_are_rejected(self):
+        batch = BoardBatch(2, nrows=1, ncols=2, winning_length=2)
+        batch.play([0, 1])
+        with self.assertRaises(ValueError):
+            batch.play([0, 0])
+        with self.assertRaises(ValueError):
+            batch.play([2, 0])
+        np.testing.assert_array_equal(batch.heights, [[1, 0], [0, 1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
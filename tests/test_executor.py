@@ -0,0 +1,77 @@
+import gc
+import time
+import unittest
+import weakref
+
+from executor import PROCESS, THREAD, MoveExecutor
+from models.board import Board
+from models.player import Player
+from models.token import Tokens
+
+
+class SlowPlayer(Player):
+    """Plays the first available column, after `secs` on the empty board. Polls
+    its cancel token when `cooperative`."""
+
+    def __init__(self, secs=1.0, cooperative=False):
+        super().__init__("Slow")
+        self.secs = secs
+        self.cooperative = cooperative
+
+    def strategy(self, board: Board) -> int:
+        if board.capacity == board.nrows * board.ncols:
+            end = time.perf_counter() + self.secs
+            while time.perf_counter() < end:
+                if self.cooperative and self.cancel_token.cancelled:
+                    break
+                time.sleep(0.005)
+        return board.get_available_columns()[0]
+
+
+class MoveExecutorTest(unittest.TestCase):
+    def make_executor(self, player, mode):
+        player.set_token(Tokens.RED)
+        executor = MoveExecutor(player, mode=mode, grace_secs=0.2)
+        self.addCleanup(executor.close)
+        return executor
+
+    def assert_timeout_then_move(self, executor):
+        with self.assertRaises(TimeoutError):
+            executor.submit(Board(), timeout=0.05)
+        self.assertIsNone(executor.last_search)
+        board = Board()
+        board.play(Tokens.RED.value, 3)
+        self.assertEqual(executor.submit(board, timeout=5), 3)
+
+    def test_thread_worker_left_behind(self):
+        executor = self.make_executor(SlowPlayer(secs=0.5), THREAD)
+        self.assert_timeout_then_move(executor)
+        self.assertIsNotNone(executor.worker)
+
+    def test_cancelled_thread_worker_is_reused(self):
+        executor = self.make_executor(SlowPlayer(cooperative=True), THREAD)
+        executor.start()
+        worker = executor.worker
+        self.assert_timeout_then_move(executor)
+        self.assertIs(executor.worker, worker)
+
+    def test_process_worker_is_killed(self):
+        executor = self.make_executor(SlowPlayer(secs=5), PROCESS)
+        executor.start()
+        worker = executor.worker
+        self.assert_timeout_then_move(executor)
+        self.assertFalse(worker.is_alive())
+        self.assertIsNot(executor.worker, worker)
+
+    def test_closed_executor_is_not_kept_alive(self):
+        executor = MoveExecutor(SlowPlayer(), mode=THREAD)
+        executor.start()
+        executor.close()
+        ref = weakref.ref(executor)
+        del executor
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from ai.alphabeta_player import AlphaBetaPlayer
+from models.board import Board
+from models.token import Tokens
+
+
+class MoveOrderingTest(unittest.TestCase):
+    def test_search_empty_grid_after_late_position(self):
+        player = AlphaBetaPlayer(depth=6, opening_book=None)
+        player.set_token(Tokens.RED)
+
+        # checkerboard of tokens: no line of 7 anywhere
+        board = Board(nrows=6, ncols=7, winning_length=7)
+        for col in range(board.ncols):
+            for row in range(board.nrows if col < 4 else board.nrows - 1):
+                board.play(1 if (row + col) % 2 else -1, col)
+        self.assertEqual(board.capacity, 3)
+        player.strategy(board)
+
+        board = Board(nrows=6, ncols=7, winning_length=7)
+        self.assertIn(player.strategy(board), range(board.ncols))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from ai.q_learning import TrainingTable, train
+from models.board import Board
+
+
+class QLearningTest(unittest.TestCase):
+    def test_update_averages_same_cells(self):
+        table = TrainingTable(ncols=3)
+        rows = table.lookup(np.array([5, 5, 5, 6], dtype=np.uint64))
+        table.update(rows, np.array([1, 1, 1, 2]), np.array([1.0, 1.0, -1.0, 1.0]), 0.5)
+        np.testing.assert_allclose(table.values[rows[0]], [0, 1 / 6, 0])
+        np.testing.assert_allclose(table.values[rows[3]], [0, 0, 0.5])
+
+    def test_opening_rows_are_learned(self):
+        table = train(2000, seed=1)
+        board = Board()
+        key, _ = board.get_canonical_exact_key(1)
+        self.assertTrue(table.values[table.rows[key]].any())
+        for col in range(board.ncols):
+            board.play(1, col)
+            key, _ = board.get_canonical_exact_key(-1)
+            self.assertTrue(table.values[table.rows[key]].any())
+            board.cancel_play(1, col)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from records import (
+    FIRST_WINS,
+    FORFEIT,
+    GameRecordWriter,
+    get_result,
+    iter_positions,
+    read_records,
+    replay,
+)
+from settings import GameSettings
+
+# the first player wins with a vertical alignment in column 3
+MOVES = [3, 2, 3, 2, 3, 2, 3]
+
+
+class RecordsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "games" / "records.bin"
+
+    def write(self, *games):
+        writer = GameRecordWriter(self.path)
+        for settings, players, moves, result in games:
+            writer.write(settings, players, moves, result)
+        writer.close()
+
+    def test_write_read_replay(self):
+        settings = GameSettings(timeout_secs=2.5)
+        small = GameSettings(
+            grid_nrows=4, grid_ncols=5, winning_length=3, timeout_secs=None
+        )
+        self.write(
+            (settings, ("Alice", "Bob"), MOVES, get_result(0)),
+            (small, ("Bob", "RL"), [0, 1], get_result(1, forfeit=True)),
+        )
+        first, second = read_records(self.path)
+
+        self.assertEqual(first.players, ("Alice", "Bob"))
+        self.assertEqual(list(first.moves), MOVES)
+        self.assertEqual((first.result, first.winner), (FIRST_WINS, 0))
+        self.assertEqual(first.settings.timeout_secs, 2.5)
+        board = replay(first)
+        self.assertEqual(board.winner_token_value, 1)
+        self.assertEqual(board.winning_cells, [(3, row) for row in range(4)])
+        cols = [col for _, _, col in iter_positions(first)]
+        self.assertEqual(cols, MOVES)
+
+        self.assertEqual((second.winner, second.forfeit), (1, True))
+        self.assertEqual(second.result & FORFEIT, FORFEIT)
+        self.assertEqual(second.settings.grid_ncols, 5)
+        self.assertIsNone(second.settings.timeout_secs)
+        board = replay(second, board)
+        self.assertEqual((board.nrows, board.ncols, board.capacity), (4, 5, 18))
+
+    def test_truncated_record_is_cut_off(self):
+        game = (GameSettings(), ("Alice", "Bob"), MOVES, get_result(0))
+        self.write(game)
+        size = self.path.stat().st_size
+        self.write(game)
+        # a crash while writing the second record
+        with self.path.open("r+b") as file:
+            file.truncate(size + 5)
+        self.assertEqual(len(list(read_records(self.path))), 1)
+
+        self.write(game, game)
+        records = list(read_records(self.path))
+        self.assertEqual(len(records), 3)
+        self.assertTrue(all(list(record.moves) == MOVES for record in records))
+
+    def test_truncated_file_header(self):
+        self.path.parent.mkdir(parents=True)
+        self.path.write_bytes(b"C4")
+        self.assertEqual(list(read_records(self.path)), [])
+        self.write((GameSettings(), ("Alice", "Bob"), MOVES, get_result(0)))
+        self.assertEqual(len(list(read_records(self.path))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from models.board import Board
+from models.player import Player, RandomPlayer
+from records import read_records
+from runner import run_match
+from settings import GameSettings
+
+
+class SleepyPlayer(Player):
+    """Plays the first available column after `secs`, polling its cancel token."""
+
+    def __init__(self, secs=5.0):
+        super().__init__("Sleepy")
+        self.secs = secs
+
+    def strategy(self, board: Board) -> int:
+        end = time.perf_counter() + self.secs
+        while time.perf_counter() < end and not self.cancel_token.cancelled:
+            time.sleep(0.005)
+        return board.get_available_columns()[0]
+
+
+class RunMatchTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "records.bin"
+
+    def test_timeout_forfeits(self):
+        settings = GameSettings(timeout_secs=0.05)
+        result = run_match(
+            SleepyPlayer(),
+            RandomPlayer("Random"),
+            2,
+            settings,
+            processes=1,
+            seed=0,
+            records_path=self.path,
+        )
+        self.assertEqual((result.losses, result.forfeits), (2, 2))
+
+        first, second = read_records(self.path)
+        # the sleepy player starts the first game and loses it on its first move
+        self.assertEqual(first.players, ("Sleepy", "Random"))
+        self.assertEqual(bytes(first.moves), b"")
+        self.assertEqual((first.winner, first.forfeit), (1, True))
+        self.assertEqual(second.players, ("Random", "Sleepy"))
+        self.assertEqual(len(second.moves), 1)
+        self.assertEqual((second.winner, second.forfeit), (0, True))
+
+    def test_no_timeout(self):
+        settings = GameSettings(timeout_secs=None)
+        result = run_match(
+            SleepyPlayer(secs=0.0), SleepyPlayer(secs=0.0), 2, settings, processes=1
+        )
+        self.assertEqual((result.games, result.forfeits), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import pickle
+import unittest
+
+from ai.transposition import (
+    ALWAYS_REPLACE,
+    DEPTH_PREFERRED,
+    EXACT,
+    LOWER_BOUND,
+    SharedTranspositionTable,
+    TranspositionTable,
+)
+
+
+class TranspositionTableTest(unittest.TestCase):
+    table_class = TranspositionTable
+
+    def make_table(self, **kwargs):
+        return self.table_class(**kwargs)
+
+    def test_store_and_get(self):
+        table = self.make_table(max_bytes=2**16)
+        table.store(12345, 6, LOWER_BOUND, -42, 3)
+        table.store(67890, 2, EXACT, 7, None)
+        self.assertEqual(table.get(12345)[:5], (12345, 6, LOWER_BOUND, -42, 3))
+        self.assertEqual(table.get(67890)[:5], (67890, 2, EXACT, 7, None))
+        self.assertIsNone(table.get(13579))
+        self.assertEqual((table.probes, table.hits), (3, 2))
+
+    def test_depth_preferred_keeps_deeper_entries(self):
+        table = self.make_table(max_bytes=0, policy=DEPTH_PREFERRED)
+        self.assertEqual(table.nbuckets, 1)
+        table.store(1, 8, EXACT, 0, 0)
+        table.store(2, 3, EXACT, 0, 0)
+        table.store(3, 4, EXACT, 0, 0)
+        self.assertIsNotNone(table.get(1))
+        self.assertIsNone(table.get(2))
+        self.assertIsNotNone(table.get(3))
+
+        # entries of previous searches are replaced whatever their depth
+        table.new_search()
+        table.store(4, 1, EXACT, 0, 0)
+        self.assertIsNone(table.get(1))
+        self.assertIsNotNone(table.get(4))
+
+    def test_always_replace(self):
+        table = self.make_table(max_bytes=0, policy=ALWAYS_REPLACE)
+        table.store(1, 8, EXACT, 0, 0)
+        table.store(2, 1, EXACT, 0, 0)
+        self.assertIsNone(table.get(1))
+        self.assertIsNotNone(table.get(2))
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            self.make_table(policy="never")
+
+
+class SharedTranspositionTableTest(TranspositionTableTest):
+    table_class = SharedTranspositionTable
+
+    def make_table(self, **kwargs):
+        table = self.table_class(**kwargs)
+        self.addCleanup(table.unlink)
+        self.addCleanup(table.close)
+        return table
+
+    def test_torn_entry_is_rejected(self):
+        table = self.make_table(max_bytes=2**16, policy=ALWAYS_REPLACE)
+        table.store(12345, 6, EXACT, 10, 3)
+        index = 2 + 2 * (12345 % table.nbuckets)
+        key_word = table.words[index]
+        # another process wrote the data word of another entry in the same slot
+        table.store(12345 + table.nbuckets, 2, LOWER_BOUND, -5, 1)
+        table.words[index] = key_word
+        self.assertIsNone(table.get(12345))
+        self.assertIsNone(table.get(12345 + table.nbuckets))
+
+    def test_pickled_table_shares_entries(self):
+        table = self.make_table(max_bytes=2**16)
+        other = pickle.loads(pickle.dumps(table))
+        self.addCleanup(other.close)
+        table.store(12345, 6, EXACT, 10, 3)
+        self.assertEqual(other.get(12345)[:5], (12345, 6, EXACT, 10, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()